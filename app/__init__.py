@@ -1,83 +1,99 @@
 import os
-import threading
-import time
 
 from fastapi import FastAPI
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
-from . import volume
-from .acp import run_cli
+from . import breaker, cli_worker, fund, journal, logs, metrics, questions, results, shard, tasks, volume
 from .config import cfg
-from .fund import do_fund
-from .privy import get_client, get_usdc_balance
-from .wallets import get_agents_with_keys, load_wallets, save_wallets
-
-
-def _do_setup():
-    try:
-        privy = get_client()
-    except ValueError as e:
-        return {"ok": False, "error": str(e)}
-
-    wallets = load_wallets()
-    remaining = cfg.num_agents - len(wallets)
-    if remaining <= 0:
-        return {"ok": True, "message": f"Already have {len(wallets)} wallets.", "wallets": len(wallets)}
-
-    created = 0
-    for _ in range(remaining):
-        _agent_names = ["celesty", "Viktor", "Jansen-huang"]
-        idx = len(wallets)
-        name = _agent_names[idx] if idx < len(_agent_names) else f"acp-client-{idx + 1:02d}"
-        try:
-            wallet = privy.create_wallet()
-        except Exception as e:
-            return {"ok": False, "error": f"Privy wallet: {e}"}
-
-        acp_data, err = run_cli("agent", "create", name)
-        acp_wallet = acp_data.get("walletAddress") if isinstance(acp_data, dict) else None
-        api_key = acp_data.get("apiKey") if isinstance(acp_data, dict) else None
-
-        wallets.append({
-            "name": name,
-            "privy_wallet_id": wallet["id"],
-            "privy_address": wallet["address"],
-            "acp_wallet": acp_wallet,
-            "acp_api_key": api_key,
-        })
-        save_wallets(wallets)
-        created += 1
-        time.sleep(1)
-
-    return {"ok": True, "message": f"Created {created} agents.", "wallets": len(wallets)}
-
-
-def _log(msg):
-    print(msg, flush=True)
-
-
-def _auto_start():
-    try:
-        _log("[auto] Running setup...")
-        result = _do_setup()
-        _log(f"[auto] Setup: {result.get('message', result.get('error', 'unknown'))}")
-
-        if not get_agents_with_keys():
-            _log("[auto] No agents with keys, skipping fund and volume start.")
-            return
-
-        _log("[auto] Funding wallets...")
-        result = do_fund()
-        _log(f"[auto] Fund: {result.get('successful', 0)}/{result.get('total', 0)} succeeded, {result.get('skipped', 0)} skipped")
-        if result.get("errors"):
-            for e in result["errors"]:
-                _log(f"[auto]   {e['name']}: {e['error']}")
-
-        _log("[auto] Starting volume bot...")
+from .governor import governor
+from .provision import do_setup, progress as setup_progress
+from .tasks import snapshots, supervisor
+from .wallets import get_agents_with_keys
+
+
+log = logs.get_logger("auto")
+
+
+def _setup(cancel):
+    result = do_setup(cancel)
+    log.info(f"[auto] Setup: {result.get('message', result.get('error', 'unknown'))}")
+    return result
+
+
+def _fund(cancel):
+    result = fund.do_fund(cancel)
+    log.info(f"[auto] Fund: {result.get('successful', 0)}/{result.get('total', 0)} succeeded, {result.get('skipped', 0)} skipped")
+    for e in result.get("errors") or []:
+        log.warning(f"[auto]   {e['name']}: {e['error']}")
+    return result
+
+
+def _start_volume():
+    if cfg.volume_workers:
+        # Workers resume their own shard's journaled jobs on start.
+        ok, msg = shard.workers.start()
+    else:
         ok, msg = volume.start()
-        _log(f"[auto] Volume: {msg}")
-    except Exception as e:
-        _log(f"[auto] FATAL: {e}")
+        if ok:
+            volume.resume_jobs()
+    snapshots.refresh()
+    return ok, msg
+
+
+def _volume(cancel):
+    ok, msg = _start_volume()
+    log.info(f"[auto] Volume: {msg}")
+    return {"ok": ok, "message": msg}
+
+
+def _await(names, cancel):
+    """Wait for the named tasks' current runs; cancels them if `cancel` is set. Returns their final states."""
+    states = {}
+    for name in names:
+        while True:
+            snap = supervisor.wait(name, timeout=0.5)
+            if snap["state"] not in (tasks.RUNNING, tasks.RETRYING):
+                break
+            if cancel.is_set():
+                supervisor.cancel(name)
+        states[name] = snap["state"]
+    return states
+
+
+def _bootstrap(cancel):
+    """Setup, fund, then start volume, each as its own task; with fast_start and every wallet ready, all at once."""
+    if cfg.fast_start and len(get_agents_with_keys()) >= cfg.num_agents:
+        log.info("[auto] Wallets already provisioned, starting volume alongside setup and fund")
+        steps = ("volume", "setup", "fund")
+        for name in steps:
+            supervisor.submit(name)
+        return {"ok": True, "fast_start": True, "steps": _await(steps, cancel)}
+    steps = {}
+    for name in ("setup", "fund", "volume"):
+        if cancel.is_set():
+            break
+        if name != "setup" and not get_agents_with_keys():
+            log.info("[auto] No agents with keys, skipping fund and volume start.")
+            break
+        log.info(f"[auto] Running {name}...")
+        supervisor.submit(name)
+        steps.update(_await([name], cancel))
+    return {"ok": True, "steps": steps}
+
+
+supervisor.register("setup", _setup)
+supervisor.register("fund", _fund)
+supervisor.register("volume", _volume)
+supervisor.register("bootstrap", _bootstrap, retries=0)
+snapshots.register("agents", lambda: len(get_agents_with_keys()))
+snapshots.register("volume", lambda: shard.workers.status() if cfg.volume_workers else volume.status())
+
+
+def _submit(name):
+    started, snap = supervisor.submit(name)
+    if not started:
+        return JSONResponse({"ok": False, "message": f"{name} already running", "task": snap}, status_code=409)
+    return JSONResponse({"ok": True, "task": snap}, status_code=202)
 
 
 def create_app():
@@ -85,30 +101,154 @@ def create_app():
 
     @app.on_event("startup")
     def on_startup():
-        threading.Thread(target=_auto_start, daemon=True).start()
+        snapshots.start()
+        # The node's only top-up scheduler; volume workers never fund.
+        fund.scheduler.start()
+        supervisor.submit("bootstrap")
+
+    @app.on_event("shutdown")
+    def on_shutdown():
+        supervisor.cancel_all()
+        fund.scheduler.stop()
+        snapshots.stop()
+        shard.workers.close()
+        cli_worker.pool.close()
+        logs.close()
 
     @app.get("/health")
-    def health():
+    async def health():
+        vol = snapshots.get("volume") or {}
+        # Jobs run in the workers, so their breakers are the ones that trip.
+        worker_states = [{service: b.get("state") for service, b in (w.get("breakers") or {}).items()}
+                         for w in vol.get("workers") or []]
         return {
             "status": "ok",
-            "volume_running": volume.running(),
-            "agents": len(get_agents_with_keys()),
+            "volume_running": vol.get("running", False),
+            "agents": snapshots.get("agents", 0),
+            "tasks": supervisor.states(),
+            "breakers": breaker.worst(breaker.states(), *worker_states),
+            "snapshot_age_sec": snapshots.age(),
         }
 
+    @app.post("/setup")
+    async def setup():
+        """Create missing wallets and agents in the background; poll /setup/progress or /tasks/setup."""
+        return _submit("setup")
+
+    @app.get("/setup/progress")
+    async def setup_status():
+        return setup_progress()
+
+    @app.post("/fund")
+    async def fund_agents():
+        """Fund agent wallets from the master wallet in the background; see /tasks/fund."""
+        return _submit("fund")
+
+    @app.get("/tasks")
+    async def task_list():
+        return supervisor.status()
+
+    @app.get("/tasks/{name}")
+    async def task_detail(name: str):
+        try:
+            return supervisor.status(name)
+        except KeyError:
+            return JSONResponse({"ok": False, "message": "unknown task"}, status_code=404)
+
+    @app.post("/tasks/{name}/start")
+    async def task_start(name: str):
+        try:
+            return _submit(name)
+        except KeyError:
+            return JSONResponse({"ok": False, "message": "unknown task"}, status_code=404)
+
+    @app.post("/tasks/{name}/cancel")
+    async def task_cancel(name: str):
+        try:
+            snap = supervisor.cancel(name)
+        except KeyError:
+            return JSONResponse({"ok": False, "message": "unknown task"}, status_code=404)
+        if snap is None:
+            return JSONResponse({"ok": False, "message": f"{name} is not running"}, status_code=409)
+        return {"ok": True, "message": "cancel requested", "task": snap}
+
     @app.post("/volume/start")
     def volume_start():
-        ok, msg = volume.start()
+        ok, msg = _start_volume()
         if not ok:
             return JSONResponse({"ok": ok, "message": msg}, status_code=400)
         return {"ok": ok, "message": msg}
 
     @app.post("/volume/stop")
     def volume_stop():
-        volume.stop()
+        if cfg.volume_workers:
+            shard.workers.stop()
+        else:
+            volume.stop()
+        snapshots.refresh()
         return {"ok": True, "message": "Volume bot stop requested."}
 
+    @app.post("/volume/rate")
+    def volume_rate(body: dict):
+        """Adjust pacing at runtime: jobs_per_minute (0 = off), max_in_flight, agent_jobs_per_minute."""
+        try:
+            limits = {k: body[k] for k in ("jobs_per_minute", "max_in_flight", "agent_jobs_per_minute") if k in body}
+            if any(float(v) < 0 for v in limits.values()):
+                raise ValueError("limits must be >= 0")
+            if cfg.volume_workers:
+                return {"ok": True, "workers": shard.workers.configure(limits)}
+            return {"ok": True, "governor": governor.configure(**limits)}
+        except (TypeError, ValueError) as e:
+            return JSONResponse({"ok": False, "message": str(e)}, status_code=400)
+
+    @app.get("/jobs")
+    def jobs(limit: int = 50, offset: int = 0, agent: str = None, status: str = None):
+        """Journaled jobs, newest first. status: open, done, or an outcome."""
+        limit = min(max(limit, 1), 500)
+        return journal.page(limit=limit, offset=max(offset, 0), agent=agent, status=status)
+
+    @app.get("/jobs/{job_id}")
+    def job_detail(job_id: str):
+        job = journal.get(job_id)
+        if job is None:
+            return JSONResponse({"ok": False, "message": "unknown job"}, status_code=404)
+        return job
+
+    @app.get("/results")
+    def latest_result(question: str = None, max_age: float = None):
+        """Latest stored deliverable for `question`; without one, the list of stored questions."""
+        if question is None:
+            return {"questions": results.questions()}
+        hit = results.latest(question, max_age=max_age)
+        if hit is None:
+            return JSONResponse({"ok": False, "message": "no stored answer"}, status_code=404)
+        return hit
+
+    @app.get("/results/stats")
+    def results_stats():
+        return results.stats()
+
+    @app.get("/fund/status")
+    def fund_status(limit: int = 50):
+        """Top-up scheduler state and the `limit` agents closest to running dry."""
+        return fund.scheduler.status(limit=limit)
+
+    @app.get("/questions/stats")
+    async def question_stats():
+        """Catalog size and coverage: how many questions have been drawn at least once."""
+        return questions.catalog().stats()
+
+    @app.post("/questions/reload")
+    def question_reload():
+        return questions.reload()
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    def prometheus_metrics():
+        text = shard.workers.metrics(metrics.render()) if cfg.volume_workers else metrics.render()
+        return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
     @app.get("/volume/status")
-    def volume_status():
-        return {"running": volume.running(), "stats": volume.stats()}
+    async def volume_status():
+        return {**(snapshots.get("volume") or {}), "snapshot_age_sec": snapshots.age()}
 
     return app
@@ -1,12 +1,14 @@
 import json
 import subprocess
 
-import requests
-
+from . import cli_worker, logs, sessions
 from .config import cfg
 
 
-def create_job(agent, question):
+log = logs.get_logger("acp")
+
+
+def _job_request(agent, question):
     url = f"{cfg.api_base_url}/acp/jobs"
     headers = {"x-api-key": agent["acp_api_key"], "Content-Type": "application/json"}
     payload = {
@@ -14,8 +16,13 @@ def create_job(agent, question):
         "jobOfferingName": cfg.job_offering,
         "serviceRequirements": {"question": question},
     }
+    return url, headers, payload
+
+
+def create_job(agent, question):
+    url, headers, payload = _job_request(agent, question)
     try:
-        r = requests.post(url, json=payload, headers=headers, timeout=30)
+        r = sessions.request("acp", "POST", url, endpoint="create_job", json=payload, headers=headers)
         if r.status_code not in (200, 201):
             return None, f"HTTP {r.status_code}: {r.text}"
         return r.json().get("data", {}).get("jobId"), None
@@ -27,7 +34,7 @@ def job_status(agent, job_id):
     url = f"{cfg.api_base_url}/acp/jobs/{job_id}"
     headers = {"x-api-key": agent["acp_api_key"]}
     try:
-        r = requests.get(url, headers=headers, timeout=30)
+        r = sessions.request("acp", "GET", url, endpoint="job_status", headers=headers)
         if r.status_code != 200:
             return None, f"HTTP {r.status_code}"
         return r.json(), None
@@ -35,14 +42,61 @@ def job_status(agent, job_id):
         return None, str(e)
 
 
+async def create_job_async(agent, question):
+    url, headers, payload = _job_request(agent, question)
+    try:
+        r = await sessions.arequest("acp", "POST", url, endpoint="create_job", json=payload, headers=headers)
+        if r.status_code not in (200, 201):
+            return None, f"HTTP {r.status_code}: {r.text}"
+        return r.json().get("data", {}).get("jobId"), None
+    except Exception as e:
+        return None, str(e) or type(e).__name__
+
+
+async def job_status_async(agent, job_id):
+    url = f"{cfg.api_base_url}/acp/jobs/{job_id}"
+    headers = {"x-api-key": agent["acp_api_key"]}
+    try:
+        r = await sessions.arequest("acp", "GET", url, endpoint="job_status", headers=headers)
+        if r.status_code != 200:
+            return None, f"HTTP {r.status_code}"
+        return r.json(), None
+    except Exception as e:
+        return None, str(e) or type(e).__name__
+
+
+def _run_cli_process(cmd):
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=60, cwd=cfg.acp_cli_path)
+    return result.returncode, result.stdout, result.stderr
+
+
+def _run_cli_worker(args):
+    """(code, stdout, stderr) from a warm worker; None if the request never reached one."""
+    try:
+        resp = cli_worker.pool.call(args, timeout=60)
+    except cli_worker.WorkerUnavailable as e:
+        log.warning(f"[cli] Worker unavailable ({e}), falling back to a one-off process")
+        return None
+    except Exception as e:
+        # The worker had the request; running it again could repeat it (a second `agent create`).
+        reason = str(e) or type(e).__name__
+        log.error(f"[cli] Worker gave no answer for {' '.join(args[:2])}: {reason}")
+        return 1, "", f"acp worker gave no answer ({reason}); not retried"
+    return resp.get("code", 1), resp.get("stdout", ""), resp.get("stderr", "")
+
+
 def run_cli(*args):
-    cmd = cfg.acp_cmd + list(args) + ["--json"]
+    args = list(args) + ["--json"]
+    stdout = ""
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=60, cwd=cfg.acp_cli_path)
-        if result.returncode != 0:
-            return None, (result.stderr or result.stdout or "").strip()
-        return json.loads(result.stdout.strip()), None
+        result = _run_cli_worker(args) if cfg.acp_cli_mode == "worker" else None
+        if result is None:
+            result = _run_cli_process(cfg.acp_cmd + args)
+        code, stdout, stderr = result
+        if code != 0:
+            return None, (stderr or stdout or "").strip()
+        return json.loads(stdout.strip()), None
     except json.JSONDecodeError:
-        return None, f"Invalid JSON: {(result.stdout[:200] if result.stdout else '')}"
+        return None, f"Invalid JSON: {(stdout[:200] if stdout else '')}"
     except Exception as e:
         return None, str(e)
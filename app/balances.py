@@ -0,0 +1,121 @@
+import threading
+import time
+from concurrent.futures import Future
+
+from .config import cfg
+
+
+class BalanceUnavailable(Exception):
+    """A balance lookup failed; unlike a 0.0 balance, this says nothing about the wallet."""
+
+
+class BalanceCache:
+    """USDC balances keyed by address with a TTL and single-flight refresh.
+
+    Concurrent misses share one lookup and its result. On a failed refresh
+    the last value is served up to balance_stale_max old.
+    """
+
+    def __init__(self, fetch):
+        self._fetch = fetch
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._inflight = {}
+        self._gens = {}
+        self._counters = {"hits": 0, "misses": 0, "coalesced": 0, "invalidations": 0, "adjustments": 0,
+                          "errors": 0, "stale": 0}
+
+    def get(self, address):
+        key = address.lower()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.monotonic() - entry[1] < cfg.balance_cache_ttl:
+                self._counters["hits"] += 1
+                return entry[0]
+            self._counters["misses"] += 1
+            fut = self._inflight.get(key)
+            owner = fut is None
+            if owner:
+                fut = self._inflight[key] = Future()
+                gen = self._gens.get(key, 0)
+            else:
+                self._counters["coalesced"] += 1
+        if not owner:
+            return fut.result()
+        try:
+            balance = self._fetch(address)
+            with self._lock:
+                # Invalidated mid-fetch: the value may predate the change, so don't cache it.
+                if self._gens.get(key, 0) == gen:
+                    self._entries[key] = (balance, time.monotonic())
+        except BalanceUnavailable as e:
+            with self._lock:
+                self._counters["errors"] += 1
+                stale = entry is not None and time.monotonic() - entry[1] < cfg.balance_stale_max
+                if stale:
+                    self._counters["stale"] += 1
+            if not stale:
+                fut.set_exception(e)
+                raise
+            balance = entry[0]
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        fut.set_result(balance)
+        return balance
+
+    def peek(self, address):
+        """The cached balance if still fresh, else None; never fetches."""
+        with self._lock:
+            entry = self._entries.get(address.lower())
+        if entry and time.monotonic() - entry[1] < cfg.balance_cache_ttl:
+            return entry[0]
+        return None
+
+    def prime(self, balances):
+        """Store freshly fetched {address: balance} values, e.g. from a batch lookup."""
+        now = time.monotonic()
+        with self._lock:
+            for address, balance in balances.items():
+                self._entries[address.lower()] = (balance, now)
+
+    def invalidate(self, address):
+        key = address.lower()
+        with self._lock:
+            self._entries.pop(key, None)
+            self._gens[key] = self._gens.get(key, 0) + 1
+            self._counters["invalidations"] += 1
+
+    def adjust(self, address, delta):
+        """Optimistically shift a cached balance; no-op if the address isn't cached."""
+        key = address.lower()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                self._entries[key] = (max(entry[0] + delta, 0.0), entry[1])
+                self._counters["adjustments"] += 1
+
+    def clear(self):
+        with self._lock:
+            for key in self._inflight:
+                self._gens[key] = self._gens.get(key, 0) + 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._counters)
+            out["entries"] = len(self._entries)
+        lookups = out["hits"] + out["misses"]
+        out["hit_rate"] = round(out["hits"] / lookups, 4) if lookups else 0.0
+        return out
+
+
+def _fetch_balance(address):
+    from .privy import get_usdc_balance_batched
+    return get_usdc_balance_batched(address)
+
+
+balance_cache = BalanceCache(_fetch_balance)
@@ -0,0 +1,153 @@
+import threading
+import time
+
+from . import logs, metrics
+from .config import cfg
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+
+log = logs.get_logger("breaker")
+
+
+class BreakerOpen(Exception):
+    """Raised instead of sending a request while the upstream's breaker is open."""
+
+    def __init__(self, service, retry_in):
+        super().__init__(f"{service} circuit open, retry in {retry_in:.1f}s")
+        self.service = service
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker for one upstream, shared by every caller.
+
+    Opens after breaker_threshold failures in a row. After the cooldown one
+    probe goes through: success closes it, failure doubles the cooldown.
+    """
+
+    def __init__(self, service):
+        self.service = service
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._cooldown = cfg.breaker_cooldown
+        self._opened_at = 0.0
+        self._probe_at = None
+        self._trips = 0
+        self._rejected = 0
+
+    def _retry_in(self, now):
+        return max(self._opened_at + self._cooldown - now, 0.0)
+
+    def allow(self):
+        """True if a request may go out now; in half-open only the single probe gets True."""
+        now = time.monotonic()
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and self._retry_in(now) > 0:
+                self._rejected += 1
+                return False
+            # Cooldown over: half-open. A probe that never reports back is written off after breaker_probe_timeout.
+            if self._probe_at is None or now - self._probe_at > cfg.breaker_probe_timeout:
+                self._state = HALF_OPEN
+                self._probe_at = now
+                return True
+            self._rejected += 1
+            return False
+
+    def check(self):
+        """allow(), raising BreakerOpen when it says no."""
+        if not self.allow():
+            raise BreakerOpen(self.service, self.retry_in())
+
+    def record(self, ok):
+        now = time.monotonic()
+        with self._lock:
+            if ok:
+                if self._state != CLOSED:
+                    log.info(f"[breaker] {self.service} recovered, circuit closed", service=self.service)
+                self._state = CLOSED
+                self._failures = 0
+                self._cooldown = cfg.breaker_cooldown
+                self._probe_at = None
+                return
+            self._failures += 1
+            if self._state == HALF_OPEN:
+                self._cooldown = min(self._cooldown * 2, cfg.breaker_max_cooldown)
+            elif self._state == OPEN or self._failures < cfg.breaker_threshold:
+                return
+            else:
+                self._trips += 1
+            self._state = OPEN
+            self._opened_at = now
+            self._probe_at = None
+        log.warning(f"[breaker] {self.service} circuit open for {self._cooldown:.0f}s after "
+                    f"{self._failures} consecutive failures", service=self.service)
+
+    def abandon(self):
+        """The request was cancelled before it could succeed or fail; free the probe slot."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probe_at = None
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and self._retry_in(time.monotonic()) == 0:
+                return HALF_OPEN
+            return self._state
+
+    def retry_in(self):
+        """Seconds until the next request may be tried (0 when closed or a probe is due)."""
+        now = time.monotonic()
+        with self._lock:
+            if self._state == CLOSED:
+                return 0.0
+            wait = self._retry_in(now)
+            if wait == 0 and self._probe_at is not None:
+                # A probe is already out; check back shortly.
+                wait = min(cfg.breaker_cooldown, cfg.breaker_probe_timeout)
+            return wait
+
+    def snapshot(self):
+        with self._lock:
+            out = {"failures": self._failures, "trips": self._trips, "rejected": self._rejected,
+                   "cooldown_sec": self._cooldown}
+        out["state"] = self.state
+        out["retry_in_sec"] = round(self.retry_in(), 3)
+        return out
+
+
+_breakers = {service: CircuitBreaker(service) for service in ("acp", "privy", "rpc")}
+
+
+def get(service):
+    return _breakers[service]
+
+
+def states():
+    return {service: b.state for service, b in _breakers.items()}
+
+
+_SEVERITY = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def worst(*state_maps):
+    """Merge {service: state} maps from several processes, keeping the worst state per service."""
+    out = {}
+    for states_map in state_maps:
+        for service, state in states_map.items():
+            if _SEVERITY.get(state, 0) >= _SEVERITY.get(out.get(service), -1):
+                out[service] = state
+    return out
+
+
+def snapshot():
+    return {service: b.snapshot() for service, b in _breakers.items()}
+
+
+_STATE_VALUE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+metrics.Gauge("acp_bot_circuit_state", "Upstream circuit breaker: 0 closed, 1 half-open, 2 open.",
+              lambda: {(s,): _STATE_VALUE[st] for s, st in states().items()}, ("service",))
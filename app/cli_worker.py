@@ -0,0 +1,143 @@
+import itertools
+import json
+import subprocess
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from . import logs
+from .config import cfg
+
+
+log = logs.get_logger("cli")
+
+
+class WorkerUnavailable(Exception):
+    """The request never reached a worker (it couldn't start, or its stdin was closed); safe to run elsewhere."""
+
+
+class CliWorker:
+    """One long-lived `acp worker` process speaking newline-delimited JSON.
+
+    Replies are matched to requests by id. A request that times out kills
+    the process; the next call starts a fresh one.
+    """
+
+    def __init__(self):
+        self._proc = None
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._ids = itertools.count(1)
+
+    def _ensure_started(self):
+        if self._proc is not None and self._proc.poll() is None:
+            return self._proc
+        self._pending = {}
+        self._proc = subprocess.Popen(
+            cfg.acp_worker_cmd,
+            cwd=cfg.acp_cli_path,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1,
+        )
+        threading.Thread(target=self._read, args=(self._proc, self._pending), daemon=True).start()
+        return self._proc
+
+    def _read(self, proc, pending):
+        for line in proc.stdout:
+            try:
+                resp = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            with self._lock:
+                fut = pending.pop(resp.get("id"), None)
+            if fut is not None:
+                fut.set_result(resp)
+        # Process exited: fail whatever was still waiting on it (and only on it).
+        with self._lock:
+            waiting = list(pending.values())
+            pending.clear()
+        for fut in waiting:
+            if not fut.done():
+                fut.set_exception(RuntimeError("acp worker exited"))
+
+    def _kill(self, proc):
+        with self._lock:
+            if self._proc is proc:
+                self._proc = None
+        if proc.poll() is None:
+            proc.kill()
+
+    def pending(self):
+        return len(self._pending)
+
+    def call(self, args, timeout):
+        """Run one CLI command; returns {"code", "stdout", "stderr"}.
+
+        Only WorkerUnavailable is safe to retry: any other error means the command may have run.
+        """
+        fut = Future()
+        with self._lock:
+            try:
+                proc = self._ensure_started()
+            except OSError as e:
+                raise WorkerUnavailable(f"could not start acp worker: {e}") from e
+            req_id = next(self._ids)
+            pending = self._pending
+            pending[req_id] = fut
+            try:
+                proc.stdin.write(json.dumps({"id": req_id, "args": list(args)}) + "\n")
+                proc.stdin.flush()
+            except (OSError, ValueError) as e:
+                # Broken pipe or closed stdin: the worker never saw the request.
+                pending.pop(req_id, None)
+                raise WorkerUnavailable(f"acp worker pipe closed: {e}") from e
+        try:
+            return fut.result(timeout)
+        except FutureTimeout:
+            # Hung: everything queued behind this request would wait on it too.
+            log.warning(f"[cli] acp worker did not answer in {timeout}s, restarting it")
+            self._kill(proc)
+            raise
+        finally:
+            with self._lock:
+                pending.pop(req_id, None)
+
+    def close(self):
+        with self._lock:
+            proc, self._proc = self._proc, None
+        if proc is not None and proc.poll() is None:
+            proc.stdin.close()
+            try:
+                proc.wait(5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+class CliWorkerPool:
+    """acp_cli_workers workers; each call goes to the least busy one."""
+
+    def __init__(self):
+        self._workers = []
+        self._lock = threading.Lock()
+
+    def call(self, args, timeout):
+        with self._lock:
+            if len(self._workers) != cfg.acp_cli_workers:
+                for w in self._workers[cfg.acp_cli_workers:]:
+                    w.close()
+                self._workers = self._workers[:cfg.acp_cli_workers]
+                while len(self._workers) < cfg.acp_cli_workers:
+                    self._workers.append(CliWorker())
+            worker = min(self._workers, key=lambda w: w.pending())
+        return worker.call(args, timeout)
+
+    def close(self):
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for w in workers:
+            w.close()
+
+
+pool = CliWorkerPool()
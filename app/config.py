@@ -9,20 +9,137 @@ load_dotenv()
 @dataclass
 class Config:
     wallets_file: str = "wallets.json"
-    api_base_url: str = "https://claw-api.virtuals.io"
+    # sqlite: one row per wallet, imports wallets_file on first open. json: rewrites wallets_file on every change.
+    wallet_store: str = field(default_factory=lambda: os.getenv("WALLET_STORE", "sqlite"))
+    wallets_db: str = "wallets.db"
+    api_base_url: str = field(default_factory=lambda: os.getenv("ACP_API_BASE_URL", "https://claw-api.virtuals.io"))
+    privy_api_base: str = field(default_factory=lambda: os.getenv("PRIVY_API_BASE", "https://api.privy.io/v1"))
+    base_rpc_url: str = field(default_factory=lambda: os.getenv("BASE_RPC_URL", "https://mainnet.base.org"))
     provider_wallet: str = "0xa51AC6fE439ba7c29AD978a92Ef29BBeF2c313dd"
     job_offering: str = "ask_gigabrain"
     min_sleep: int = 300
     max_sleep: int = 300
     poll_interval: int = 5
+    poll_tick: float = 0.5
+    poll_wheel_slots: int = 512
+    poll_min_interval: float = 1
+    poll_max_interval: float = 30
+    poll_backoff: float = 1.5
+    poll_learning_rate: float = 0.2
+    poll_workers: int = 32
     job_timeout_sec: int = 300
     num_agents: int = 3
     amount_usdc: float = 1.0
+    # "threads" is the default and the faster engine at scale; add VOLUME_WORKERS to go past one core.
+    # "async" matches it up to ~100 agents on similar CPU but costs more per request beyond that.
+    engine: str = field(default_factory=lambda: os.getenv("VOLUME_ENGINE", "threads"))
+    async_max_connections: int = 100
+    async_pool_shards: int = 8
+    acp_pool_size: int = 100
+    privy_pool_size: int = 10
+    rpc_pool_size: int = 20
+    acp_timeout: float = 30
+    privy_timeout: float = 30
+    rpc_timeout: float = 10
+    http_retries: int = 3
+    http_backoff: float = 0.5
+    breaker_threshold: int = 5
+    breaker_cooldown: float = 5
+    breaker_max_cooldown: float = 120
+    breaker_probe_timeout: float = 60
+    rpc_batch_size: int = 100
+    balance_batch_window: float = 0.05
+    balance_cache_ttl: float = 60
+    # Oldest cached balance served while lookups fail; past it callers get BalanceUnavailable.
+    balance_stale_max: float = 300
+    job_price_usdc: float = 0.01
+    questions_file: str = field(default_factory=lambda: os.getenv("QUESTIONS_FILE", ""))
+    question_recent: int = 20
+    question_redraws: int = 8
+    fund_min_balance: float = 0.5
+    fund_check_interval: float = 15
+    fund_lead_sec: float = 300
+    fund_target_sec: float = 1800
+    fund_burn_window: float = 600
+    fund_retry_sec: float = 10
+    # Volume workers don't fund: they queue spend and top-up requests for the main app,
+    # which collects them every fund_demand_interval seconds.
+    fund_remote: bool = field(default_factory=lambda: os.getenv("FUND_REMOTE", "0") == "1")
+    fund_demand_interval: float = 2
+    disperse_contract: str = field(default_factory=lambda: os.getenv("DISPERSE_CONTRACT", ""))
+    disperse_batch_size: int = 100
+    disperse_allowance_usdc: float = 1000.0
+    disperse_approve_wait: float = 60
+    # After a disperse fails past submission, how long to watch balances for it to land before resending.
+    disperse_settle_wait: float = 90
+    job_events: bool = field(default_factory=lambda: os.getenv("ACP_JOB_EVENTS", "1") != "0")
+    acp_socket_url: str = field(default_factory=lambda: os.getenv("ACP_SOCKET_URL", "https://acpx.virtuals.io"))
+    acp_socket_transports: str = field(default_factory=lambda: os.getenv("ACP_SOCKET_TRANSPORTS", "websocket"))
+    event_fallback_poll_interval: int = 30
     acp_cli_path: str = field(default_factory=lambda: os.getenv("ACP_CLI_PATH", "./openclaw-acp"))
+    acp_cli_mode: str = field(default_factory=lambda: os.getenv("ACP_CLI_MODE", "worker"))
+    acp_cli_workers: int = 2
+    setup_concurrency: int = 4
+    setup_rate_per_sec: float = 2
+    target_jobs_per_minute: float = field(default_factory=lambda: float(os.getenv("TARGET_JOBS_PER_MINUTE", "0")))
+    max_in_flight: int = field(default_factory=lambda: int(os.getenv("MAX_IN_FLIGHT", "0")))
+    agent_jobs_per_minute: float = field(default_factory=lambda: float(os.getenv("AGENT_JOBS_PER_MINUTE", "0")))
+    rate_burst: int = 1
+    # Jobs one agent keeps outstanding at once; each is its own create -> poll -> sleep lane.
+    agent_max_in_flight: int = field(default_factory=lambda: int(os.getenv("AGENT_MAX_IN_FLIGHT", "1")))
+    drain_timeout: float = 120
+    log_level: str = field(default_factory=lambda: os.getenv("LOG_LEVEL", "info").lower())
+    log_format: str = field(default_factory=lambda: os.getenv("LOG_FORMAT", "json"))
+    log_sample_every: int = field(default_factory=lambda: int(os.getenv("LOG_SAMPLE_EVERY", "10")))
+    log_batch_size: int = 512
+    log_flush_interval: float = 0.5
+    log_queue_size: int = 50000
+    deliverables_file: str = field(default_factory=lambda: os.getenv("DELIVERABLES_LOG", "deliverables.log"))
+    deliverables_max_bytes: int = 50 * 1024 * 1024
+    deliverables_backups: int = 5
+    journal_file: str = field(default_factory=lambda: os.getenv("JOB_JOURNAL", "jobs.db"))
+    journal_flush_interval: float = 0.5
+    shard_index: int = field(default_factory=lambda: int(os.getenv("SHARD_INDEX", "0")))
+    shard_count: int = field(default_factory=lambda: int(os.getenv("SHARD_COUNT", "1")))
+    volume_workers: int = field(default_factory=lambda: int(os.getenv("VOLUME_WORKERS", "0")))
+    volume_worker_port: int = field(default_factory=lambda: int(os.getenv("VOLUME_WORKER_PORT", "5100")))
+    volume_worker_timeout: float = 10
+    fast_start: bool = field(default_factory=lambda: os.getenv("FAST_START", "1") != "0")
+    task_retries: int = 3
+    task_retry_backoff: float = 5
+    snapshot_interval: float = 2
+    volume_worker_start_timeout: float = 60
+    results_file: str = field(default_factory=lambda: os.getenv("RESULTS_DB", "results.db"))
+    result_bucket_sec: int = 3600
+    result_store_max_bytes: int = field(default_factory=lambda: int(os.getenv("RESULT_STORE_MAX_BYTES", str(100 * 1024 * 1024))))
+    # Set for volume worker i: it writes its own journal, results and deliverables files (see own_path).
+    worker_index: int = field(default_factory=lambda: int(os.getenv("WORKER_INDEX", "-1")))
+
+    def _acp_script(self, name):
+        # Prefer the precompiled build (`npm run build`) over transpiling with tsx on every start.
+        root = os.path.abspath(self.acp_cli_path)
+        compiled = os.path.join(root, "dist", "bin", f"{name}.js")
+        if os.path.exists(compiled):
+            return ["node", compiled]
+        return ["npx", "tsx", os.path.join(root, "bin", f"{name}.ts")]
+
+    def own_path(self, path):
+        """The file this process writes for `path`; volume workers never share one."""
+        return worker_path(path, self.worker_index) if self.worker_index >= 0 else path
 
     @property
     def acp_cmd(self):
-        return ["npx", "tsx", os.path.join(self.acp_cli_path, "bin", "acp.ts")]
+        return self._acp_script("acp")
+
+    @property
+    def acp_worker_cmd(self):
+        return self._acp_script("worker")
+
+
+def worker_path(path, index):
+    """jobs.db -> jobs.<index>.db"""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{index}{ext}"
 
 
 cfg = Config()
@@ -0,0 +1,116 @@
+import threading
+import time
+
+from . import logs
+from .config import cfg
+
+RECONNECT_AFTER_SEC = 60
+
+
+log = logs.get_logger("events")
+
+
+class JobEvents:
+    """Push-based job updates from the ACP socket, one connection per agent wallet.
+
+    Every onNewTask/onEvaluate event for a tracked job is handed to the
+    registered listeners, which poll the REST status in response. A missing
+    or dead socket therefore just degrades to polling.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._last_attempt = {}
+        self._tracked = set()
+        self._listeners = []
+        self._received = 0
+
+    # -- connections --
+
+    def watch(self, agent):
+        """Make sure the agent's wallet has a socket; connects in the background, retried every RECONNECT_AFTER_SEC."""
+        wallet = agent.get("acp_wallet")
+        if not cfg.job_events or not wallet:
+            return
+        with self._lock:
+            client = self._clients.get(wallet)
+            if client is not None and client.connected:
+                return
+            if time.time() - self._last_attempt.get(wallet, 0) < RECONNECT_AFTER_SEC:
+                return
+            self._last_attempt[wallet] = time.time()
+        threading.Thread(target=self._connect, args=(agent["name"], wallet), daemon=True).start()
+
+    def _connect(self, name, wallet):
+        import socketio  # deferred: not needed until the first agent connects
+
+        client = socketio.Client(reconnection=True)
+        client.on("roomJoined", lambda *_: True)
+        client.on("onNewTask", lambda data, *_: self._on_event(data))
+        client.on("onEvaluate", lambda data, *_: self._on_event(data))
+        try:
+            client.connect(cfg.acp_socket_url, auth={"walletAddress": wallet},
+                           transports=cfg.acp_socket_transports.split(","))
+        except Exception as e:
+            log.warning(f"[{name}] ACP socket unavailable ({e}), polling only", agent=name)
+            return
+        with self._lock:
+            old = self._clients.get(wallet)
+            self._clients[wallet] = client
+        if old is not None:
+            old.disconnect()
+        log.info(f"[{name}] ACP socket connected", agent=name)
+
+    def connected(self, agent):
+        client = self._clients.get(agent.get("acp_wallet"))
+        return client is not None and client.connected
+
+    def close(self):
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            self._last_attempt.clear()
+        for client in clients:
+            try:
+                client.disconnect()
+            except Exception:
+                pass
+
+    # -- job listeners --
+
+    def add_listener(self, fn):
+        """fn(job_id) is called from the socket thread for every event on a tracked job."""
+        self._listeners.append(fn)
+
+    def _on_event(self, data):
+        if not isinstance(data, dict) or data.get("id") is None:
+            return True
+        job_id = str(data["id"])
+        with self._lock:
+            self._received += 1
+            if job_id not in self._tracked:
+                return True
+        for fn in self._listeners:
+            fn(job_id)
+        return True
+
+    def track(self, job_id):
+        with self._lock:
+            self._tracked.add(str(job_id))
+
+    def forget(self, job_id):
+        with self._lock:
+            self._tracked.discard(str(job_id))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": cfg.job_events,
+                "sockets": sum(1 for c in self._clients.values() if c.connected),
+                "events_received": self._received,
+                "tracked_jobs": len(self._tracked),
+            }
+
+
+job_events = JobEvents()
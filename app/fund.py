@@ -1,69 +1,429 @@
+import math
 import os
+import threading
+import time
 
+from .balances import balance_cache
+from . import breaker, logs, shard
 from .config import cfg
-from .privy import get_client, get_usdc_balance
+from .privy import TransactionNotSent, get_client, get_usdc_balances
 from .wallets import get_agents_with_keys
 
 MAX_FUND_PER_WALLET = 5.0
 
+_run_lock = threading.Lock()
+_active_run = None
 
-def _log(msg):
-    print(msg, flush=True)
 
+log = logs.get_logger("fund")
 
-def do_fund():
+
+def do_fund(cancel=None):
+    """Fund agents from the master wallet; joins a run already in progress. `cancel` stops further transfers."""
+    global _active_run
+    with _run_lock:
+        run = _active_run
+        owner = run is None
+        if owner:
+            run = _active_run = {"done": threading.Event(), "result": None}
+    if not owner:
+        log.info("[fund] Fund run already in progress, waiting for it")
+        run["done"].wait()
+        return run["result"] or {"ok": False, "error": "fund run failed"}
+    try:
+        run["result"] = _do_fund(cancel)
+        return run["result"]
+    finally:
+        with _run_lock:
+            _active_run = None
+        run["done"].set()
+
+
+def _try_run(fn):
+    """Run fn() as the active fund run; returns None at once if another run is in progress."""
+    global _active_run
+    with _run_lock:
+        if _active_run is not None:
+            return None
+        run = _active_run = {"done": threading.Event(), "result": None}
+    try:
+        run["result"] = fn()
+        return run["result"]
+    finally:
+        with _run_lock:
+            _active_run = None
+        run["done"].set()
+
+
+def _disperse(privy, master_id, master_addr, items, latencies, errors):
+    """Fund every (wallet, amount, floor) in `items` in one disperse; returns the items still to send one by one."""
+    t0 = time.time()
+    transfers = [(w["acp_wallet"], amount) for w, amount, _ in items]
+    try:
+        privy.disperse_usdc(master_id, master_addr, transfers, sponsor=False)
+    except (TransactionNotSent, breaker.BreakerOpen) as e:
+        log.warning(f"[fund] Batch transfer to {len(items)} agents not sent ({e}), sending individually")
+        return list(items)
+    except Exception as e:
+        log.warning(f"[fund] Batch transfer to {len(items)} agents failed after submission "
+                    f"({str(e) or type(e).__name__}), checking balances before resending")
+        return _unsettled(items, errors)
+    elapsed = round(time.time() - t0, 3)
+    for w, _, _ in items:
+        latencies[w.get("name")] = elapsed
+    log.info(f"[fund] {len(items)} agents funded {sum(a for _, a, _ in items):.4f} USDC in one transaction")
+    return []
+
+
+def _unsettled(items, errors):
+    """Items still below their floor after disperse_settle_wait; unreadable wallets go to `errors`, not resent."""
+    addresses = [w["acp_wallet"] for w, _, _ in items]
+    deadline = time.monotonic() + cfg.disperse_settle_wait
+    while True:
+        balances = get_usdc_balances(addresses)
+        balance_cache.prime(balances)
+        if any(balances.get(w["acp_wallet"], -1.0) >= floor for w, _, floor in items):
+            log.info(f"[fund] Batch transfer to {len(items)} agents landed after all")
+            return []
+        if time.monotonic() >= deadline:
+            break
+        time.sleep(2)
+    pending = []
+    for item in items:
+        w = item[0]
+        if w["acp_wallet"] in balances:
+            pending.append(item)
+        else:
+            errors.append({"name": w.get("name"), "error": "batch outcome unknown and balance unavailable"})
+    log.warning(f"[fund] Batch transfer to {len(items)} agents not seen on-chain after "
+                f"{cfg.disperse_settle_wait:.0f}s, sending {len(pending)} individually")
+    return pending
+
+
+def _send(privy, master_id, master_addr, items, cancel=None):
+    """Pay each (wallet, amount, floor) in `items` from the master wallet; returns (latencies, errors).
+
+    Batches go through disperse when DISPERSE_CONTRACT is set. Individual
+    transfers go out one at a time, since they share the master's nonce.
+    """
+    latencies = {}
+    errors = []
+
+    if cfg.disperse_contract and len(items) > 1:
+        single = []
+        size = max(cfg.disperse_batch_size, 1)
+        for start in range(0, len(items), size):
+            chunk = items[start:start + size]
+            if cancel is not None and cancel.is_set():
+                single.extend(chunk)
+            else:
+                single.extend(_disperse(privy, master_id, master_addr, chunk, latencies, errors))
+    else:
+        single = items
+
+    for w, amount, _ in single:
+        if cancel is not None and cancel.is_set():
+            errors.append({"name": w.get("name"), "error": "cancelled"})
+            continue
+        t0 = time.time()
+        try:
+            privy.transfer_usdc(from_wallet_id=master_id, to_address=w["acp_wallet"], amount_usdc=amount,
+                                sponsor=False)
+            log.info(f"[fund] {w.get('name')} funded {amount:.4f} USDC")
+        except Exception as e:
+            errors.append({"name": w.get("name"), "error": str(e)})
+        finally:
+            latencies[w.get("name")] = round(time.time() - t0, 3)
+    if cfg.volume_workers:
+        failed = {e["name"] for e in errors}
+        shard.workers.credit({w["acp_wallet"]: amount for w, amount, _ in items if w.get("name") not in failed})
+    return latencies, errors
+
+
+def _master():
+    """(master_id, master_addr, privy client) or an error dict."""
     master_id = os.getenv("PRIVY_MASTER_WALLET_ID")
     master_addr = os.getenv("PRIVY_MASTER_WALLET_ADDRESS")
     if not master_id:
         return {"ok": False, "error": "PRIVY_MASTER_WALLET_ID not set in .env"}
     if not master_addr:
         return {"ok": False, "error": "PRIVY_MASTER_WALLET_ADDRESS not set in .env"}
-
     try:
-        privy = get_client()
+        return master_id, master_addr, get_client()
     except ValueError as e:
         return {"ok": False, "error": str(e)}
 
-    agents = get_agents_with_keys()[:cfg.num_agents]
+
+def _do_fund(cancel=None):
+    master = _master()
+    if isinstance(master, dict):
+        return master
+    master_id, master_addr, privy = master
+
+    # Fund this shard's agents, but split the master wallet over every agent.
+    everyone = get_agents_with_keys()[:cfg.num_agents]
+    agents = shard.mine(everyone)
     if not agents:
         return {"ok": False, "error": f"No agents in {cfg.wallets_file}"}
 
-    master_balance = get_usdc_balance(master_addr)
-    _log(f"[fund] Master balance: {master_balance:.4f} USDC for {len(agents)} agents")
+    started = time.time()
+    # One batched round-trip for the master and every agent wallet.
+    balances = get_usdc_balances([master_addr] + [w.get("acp_wallet") for w in agents])
+    balance_cache.prime(balances)
+    if master_addr not in balances:
+        return {"ok": False, "error": "Could not read the master wallet balance (RPC unavailable)"}
+    master_balance = balances[master_addr]
+    log.info(f"[fund] Master balance: {master_balance:.4f} USDC for {len(agents)} agents")
 
     if master_balance < 0.01:
         return {"ok": False, "error": f"Master wallet has no USDC ({master_balance:.4f})"}
 
-    amount_each = min(round(master_balance / len(agents), 6), MAX_FUND_PER_WALLET)
-    _log(f"[fund] Distributing {amount_each:.4f} USDC per agent")
-
-    successful = 0
-    skipped = 0
-    errors = []
+    amount_each = min(round(master_balance / len(everyone), 6), MAX_FUND_PER_WALLET)
+    log.info(f"[fund] Distributing {amount_each:.4f} USDC per agent")
 
+    skipped = unknown = 0
+    pending = []
     for w in agents:
         to = w.get("acp_wallet")
         if not to:
             continue
-        balance = get_usdc_balance(to)
+        balance = balances.get(to)
+        if balance is None:
+            # Lookup failed; funding it blind could double up. The scheduler retries later.
+            unknown += 1
+            continue
         if balance >= amount_each:
-            _log(f"[fund] {w.get('name')} already has {balance:.4f} USDC, skipping")
+            log.debug(f"[fund] {w.get('name')} already has {balance:.4f} USDC, skipping")
             skipped += 1
             continue
-        try:
-            privy.transfer_usdc(from_wallet_id=master_id, to_address=to, amount_usdc=amount_each, sponsor=False)
-            _log(f"[fund] {w.get('name')} funded {amount_each:.4f} USDC")
-            successful += 1
-        except Exception as e:
-            errors.append({"name": w.get("name"), "error": str(e)})
+        pending.append(w)
+
+    latencies, errors = _send(privy, master_id, master_addr, [(w, amount_each, amount_each) for w in pending], cancel)
 
     return {
         "ok": True,
-        "successful": successful,
+        "successful": len(pending) - len(errors),
         "skipped": skipped,
+        "unknown": unknown,
         "failed": len(errors),
         "total": len(agents),
         "amount_per_wallet": amount_each,
         "master_balance_before": master_balance,
+        "duration_sec": round(time.time() - started, 3),
+        "latencies": latencies,
         "errors": errors[:10],
     }
+
+
+class FundScheduler:
+    """Tops agent wallets up ahead of time, off the job path.
+
+    Agents below fund_min_balance or due to run dry within fund_lead_sec
+    (at their recent burn rate) get fund_target_sec of burn, batched
+    together. The main app runs the node's only scheduler; volume workers
+    queue their spend and requests for it (cfg.fund_remote).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._agents = []
+        self._burn = {}
+        self._requested = set()
+        self._outbox = {"spend": {}, "requested": set()}
+        self._checked_at = None
+        self._last = None
+        self._totals = {"checks": 0, "topups": 0, "transfers": 0, "failed": 0, "usdc_sent": 0.0}
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="fund-scheduler", daemon=True)
+            self._thread.start()
+            if cfg.volume_workers:
+                threading.Thread(target=self._pull_demand, name="fund-demand", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def running(self):
+        return bool(self._thread and self._thread.is_alive())
+
+    def record_spend(self, name, amount):
+        if cfg.fund_remote:
+            with self._lock:
+                spend = self._outbox["spend"]
+                spend[name] = spend.get(name, 0.0) + amount
+            return
+        now = time.monotonic()
+        with self._lock:
+            rate, at, since = self._burn.get(name, (0.0, now, now))
+            rate = rate * math.exp(-(now - at) / cfg.fund_burn_window) + amount / cfg.fund_burn_window
+            self._burn[name] = (rate, now, since)
+
+    def burn_rate(self, name):
+        """USDC per second this agent has been spending lately."""
+        now = time.monotonic()
+        with self._lock:
+            rate, at, since = self._burn.get(name, (0.0, now, now))
+        # Scale up until the window fills, but never over less than window/10.
+        span = max(now - since, cfg.fund_burn_window / 10)
+        filled = 1 - math.exp(-span / cfg.fund_burn_window)
+        return rate * math.exp(-(now - at) / cfg.fund_burn_window) / filled
+
+    def request(self, agent):
+        """Ask for a check soon because `agent` is short; returns immediately."""
+        if cfg.fund_remote:
+            with self._lock:
+                self._outbox["requested"].add(agent["name"])
+            return
+        with self._lock:
+            self._requested.add(agent["name"])
+        self._wake.set()
+
+    def drain_demand(self):
+        """(fund_remote) {"spend": {name: usdc}, "requested": [name]} queued since the last call."""
+        with self._lock:
+            out, self._outbox = self._outbox, {"spend": {}, "requested": set()}
+        return {"spend": out["spend"], "requested": sorted(out["requested"])}
+
+    def _pull_demand(self):
+        """Fold the volume workers' queued spend and top-up requests into this scheduler."""
+        while not self._stop.wait(cfg.fund_demand_interval):
+            try:
+                replies = shard.workers.demand()
+            except Exception as e:
+                log.warning(f"[fund] Could not collect worker fund demand: {e}")
+                continue
+            with self._lock:
+                wallets = {a["name"]: a["acp_wallet"] for a in self._agents}
+            for reply in replies:
+                for name, amount in (reply.get("spend") or {}).items():
+                    self.record_spend(name, amount)
+                    if name in wallets:
+                        balance_cache.adjust(wallets[name], -amount)
+                for name in reply.get("requested") or []:
+                    self.request({"name": name})
+
+    def _run(self):
+        log.info("[fund] Scheduler started")
+        while not self._stop.is_set():
+            try:
+                self.check()
+            except Exception as e:
+                log.error(f"[fund] Scheduler check failed: {e}")
+            self._wake.wait(cfg.fund_check_interval)
+            self._wake.clear()
+        log.info("[fund] Scheduler stopped")
+
+    def _plan(self, agents, requested):
+        """[(agent, balance, amount)] to top up now; empty unless at least one agent is due."""
+        due_any, plan = False, []
+        for a in agents:
+            balance = balance_cache.peek(a["acp_wallet"])
+            if balance is None:
+                # Unknown (lookup failed), not empty: don't fund on a guess.
+                continue
+            rate = self.burn_rate(a["name"])
+            runway = balance / rate if rate > 0 else math.inf
+            due = balance < cfg.fund_min_balance or runway < cfg.fund_lead_sec or a["name"] in requested
+            if not (due or runway < 2 * cfg.fund_lead_sec):
+                continue
+            target = min(max(rate * cfg.fund_target_sec, 2 * cfg.fund_min_balance), MAX_FUND_PER_WALLET)
+            amount = round(target - balance, 6)
+            if amount >= 0.01:
+                due_any = due_any or due
+                plan.append((a, balance, amount))
+        return plan if due_any else []
+
+    def check(self):
+        """Refresh stale balances, then send one coalesced top-up if any agent is due."""
+        # Re-read each time so agents added by setup are covered without a restart.
+        agents = [a for a in shard.mine(get_agents_with_keys()[:cfg.num_agents]) if a.get("acp_wallet")]
+        with self._lock:
+            self._agents = agents
+            requested, self._requested = self._requested, set()
+            self._totals["checks"] += 1
+            self._checked_at = time.time()
+        stale = [a["acp_wallet"] for a in agents if balance_cache.peek(a["acp_wallet"]) is None]
+        if stale:
+            balance_cache.prime(get_usdc_balances(stale))
+        plan = self._plan(agents, requested)
+        last = self._last
+        if last and not last.get("ok") and time.time() - last["at"] < cfg.fund_check_interval:
+            # Master wallet was empty or misconfigured moments ago; don't retry on every agent's request.
+            return
+        if plan:
+            _try_run(lambda: self._top_up(plan))
+
+    def _top_up(self, plan):
+        master = _master()
+        if isinstance(master, dict):
+            return self._record(master)
+        master_id, master_addr, privy = master
+        started = time.time()
+        master_balance = get_usdc_balances([master_addr]).get(master_addr)
+        if master_balance is None:
+            return self._record({"ok": False, "error": "Could not read the master wallet balance (RPC unavailable)"})
+        need = sum(amount for _, _, amount in plan)
+        if master_balance < 0.01:
+            return self._record({"ok": False, "error": f"Master wallet has no USDC ({master_balance:.4f})"})
+        # Short master: everyone gets the same share of what they asked for.
+        scale = min(1.0, master_balance / need)
+        # Half the top-up is enough to tell it landed, even if the agent kept spending meanwhile.
+        items = [(a, round(amount * scale, 6), balance + amount * scale / 2) for a, balance, amount in plan]
+        log.info(f"[fund] Topping up {len(items)} agents with {need * scale:.4f} USDC "
+                 f"(master {master_balance:.4f} USDC)")
+        latencies, errors = _send(privy, master_id, master_addr, items)
+        failed = {e["name"] for e in errors}
+        return self._record({
+            "ok": True,
+            "successful": len(items) - len(errors),
+            "failed": len(errors),
+            "total": len(items),
+            "usdc_sent": round(sum(amount for a, amount, _ in items if a["name"] not in failed), 6),
+            "master_balance_before": master_balance,
+            "duration_sec": round(time.time() - started, 3),
+            "latencies": latencies,
+            "errors": errors[:10],
+        })
+
+    def _record(self, result):
+        if not result.get("ok"):
+            log.error(f"[fund] Top-up failed: {result['error']} — waiting for master wallet top-up")
+        with self._lock:
+            self._last = {"at": time.time(), **result}
+            if result.get("ok"):
+                self._totals["topups"] += 1
+                self._totals["transfers"] += result["successful"]
+                self._totals["failed"] += result["failed"]
+                self._totals["usdc_sent"] = round(self._totals["usdc_sent"] + result["usdc_sent"], 6)
+        return result
+
+    def status(self, limit=50):
+        """Scheduler state plus the `limit` agents closest to running dry."""
+        with self._lock:
+            agents = list(self._agents)
+            out = {"running": self.running(), "checked_at": self._checked_at, "totals": dict(self._totals),
+                   "last_topup": self._last}
+        rows = []
+        for a in agents:
+            balance = balance_cache.peek(a["acp_wallet"])
+            rate = self.burn_rate(a["name"])
+            runway = balance / rate if balance is not None and rate > 0 else None
+            rows.append({"name": a["name"], "balance": balance, "burn_usdc_per_hour": round(rate * 3600, 6),
+                         "runway_sec": None if runway is None else round(runway, 1)})
+        rows.sort(key=lambda r: (r["runway_sec"] is None, r["runway_sec"] or 0))
+        out["agents"] = rows[:max(limit, 0)]
+        out["agent_count"] = len(agents)
+        out["config"] = {k: getattr(cfg, k) for k in (
+            "fund_min_balance", "fund_check_interval", "fund_lead_sec", "fund_target_sec", "fund_burn_window")}
+        return out
+
+
+scheduler = FundScheduler()
@@ -0,0 +1,143 @@
+import asyncio
+import threading
+from collections import deque
+
+from . import metrics
+from .config import cfg
+from .ratelimit import TokenBucket
+
+
+class JobGovernor:
+    """Global pacing for job creation in target-rate mode.
+
+    Agents take a token from their own bucket, then queue FIFO for an
+    in-flight slot and a token from the global bucket. Limits can be
+    changed at runtime through configure().
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._global = TokenBucket(0)
+        self._agents = {}
+        self._queue = deque()
+        self._inflight = 0
+        self._started = 0
+        self.configure()
+
+    def enabled(self):
+        return cfg.target_jobs_per_minute > 0
+
+    def configure(self, jobs_per_minute=None, max_in_flight=None, agent_jobs_per_minute=None):
+        with self._cond:
+            if jobs_per_minute is not None:
+                cfg.target_jobs_per_minute = float(jobs_per_minute)
+            if max_in_flight is not None:
+                cfg.max_in_flight = int(max_in_flight)
+            if agent_jobs_per_minute is not None:
+                cfg.agent_jobs_per_minute = float(agent_jobs_per_minute)
+            self._global.set_rate(cfg.target_jobs_per_minute / 60, burst=cfg.rate_burst)
+            for bucket in self._agents.values():
+                bucket.set_rate(cfg.agent_jobs_per_minute / 60)
+            self._cond.notify_all()
+        return self.stats()
+
+    def _agent_bucket(self, name):
+        with self._cond:
+            bucket = self._agents.get(name)
+            if bucket is None:
+                bucket = self._agents[name] = TokenBucket(cfg.agent_jobs_per_minute / 60)
+            return bucket
+
+    def _step(self, name):
+        """One admission attempt for a queued agent. Returns 0 if admitted, else seconds to wait."""
+        with self._cond:
+            if name not in self._queue:
+                self._queue.append(name)
+            if self._queue[0] != name:
+                # Roughly when our turn comes; refined on every notify.
+                rate = max(cfg.target_jobs_per_minute / 60, 1e-3)
+                return min(max(self._queue.index(name) / rate, 0.05), 5.0)
+            if cfg.max_in_flight and self._inflight >= cfg.max_in_flight:
+                return 0.5
+            ok, wait = self._global.try_acquire()
+            if not ok:
+                return 1.0 if wait is None else wait
+            self._queue.popleft()
+            self._inflight += 1
+            self._started += 1
+            self._cond.notify_all()
+            return 0
+
+    def _leave(self, name):
+        with self._cond:
+            if name in self._queue:
+                self._queue.remove(name)
+                self._cond.notify_all()
+
+    def _waiting(self, stop):
+        return not stop.is_set() and self.enabled()
+
+    def acquire(self, agent, stop):
+        """Block until the agent may start a job; False if `stop` is set or target-rate mode is switched off."""
+        name = agent["name"]
+        admitted = False
+        try:
+            while cfg.agent_jobs_per_minute > 0 and self._waiting(stop):
+                ok, wait = self._agent_bucket(name).try_acquire()
+                if ok:
+                    break
+                with self._cond:
+                    self._cond.wait(1.0 if wait is None else min(wait, 1.0))
+            while self._waiting(stop):
+                wait = self._step(name)
+                if wait == 0:
+                    admitted = True
+                    return True
+                with self._cond:
+                    self._cond.wait(min(wait, 1.0))
+            return False
+        finally:
+            if not admitted:
+                self._leave(name)
+
+    async def acquire_async(self, agent, stop):
+        name = agent["name"]
+        admitted = False
+        try:
+            while cfg.agent_jobs_per_minute > 0 and self._waiting(stop):
+                ok, wait = self._agent_bucket(name).try_acquire()
+                if ok:
+                    break
+                await asyncio.sleep(1.0 if wait is None else min(wait, 1.0))
+            while self._waiting(stop):
+                wait = self._step(name)
+                if wait == 0:
+                    admitted = True
+                    return True
+                await asyncio.sleep(min(wait, 1.0))
+            return False
+        finally:
+            if not admitted:
+                self._leave(name)
+
+    def release(self):
+        with self._cond:
+            self._inflight = max(self._inflight - 1, 0)
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "enabled": self.enabled(),
+                "jobs_per_minute": cfg.target_jobs_per_minute,
+                "max_in_flight": cfg.max_in_flight,
+                "agent_jobs_per_minute": cfg.agent_jobs_per_minute,
+                "in_flight": self._inflight,
+                "queued": len(self._queue),
+                "started": self._started,
+            }
+
+
+governor = JobGovernor()
+metrics.Gauge("acp_bot_governor_in_flight", "Jobs holding a governor slot.", lambda: governor.stats()["in_flight"])
+metrics.Gauge("acp_bot_governor_queued", "Agents waiting for a governor slot.", lambda: governor.stats()["queued"])
@@ -0,0 +1,242 @@
+import atexit
+import glob
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+
+from . import logs
+from .config import cfg, worker_path
+
+log = logs.get_logger("journal")
+
+
+class JobJournal:
+    """On-disk record of every job this bot created (SQLite, WAL).
+
+    Writes only enqueue; a writer thread commits them in batches every
+    journal_flush_interval. Jobs with no outcome are resumed after a restart.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._retry = []
+        self._thread = None
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " job_id TEXT PRIMARY KEY,"
+            " agent TEXT NOT NULL,"
+            " question TEXT,"
+            " phase TEXT,"
+            " outcome TEXT,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " finished_at REAL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_phases ("
+            " job_id TEXT NOT NULL,"
+            " phase TEXT NOT NULL,"
+            " at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_created ON jobs(created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_open ON jobs(outcome) WHERE outcome IS NULL")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS job_phases_job ON job_phases(job_id)")
+
+    # -- writes (hot path: enqueue only) --
+
+    def _put(self, op):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="job-journal", daemon=True)
+                    self._thread.start()
+        self._queue.put(op)
+
+    def created(self, job_id, agent, question):
+        self._put(("created", str(job_id), agent, question, time.time()))
+
+    def phase(self, job_id, phase):
+        self._put(("phase", str(job_id), phase, time.time()))
+
+    def finished(self, job_id, outcome):
+        self._put(("finished", str(job_id), outcome, time.time()))
+
+    def _run(self):
+        while True:
+            time.sleep(cfg.journal_flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                log.error(f"[journal] write failed: {e}")
+
+    def flush(self):
+        """Commit everything queued so far in one transaction; a failed batch is retried first next time."""
+        # Serialized so a later batch can never commit before an earlier one.
+        with self._flush_lock:
+            ops, self._retry = self._retry, []
+            while True:
+                try:
+                    ops.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not ops:
+                return
+            with self._lock:
+                try:
+                    self._conn.execute("BEGIN IMMEDIATE")
+                except Exception:
+                    self._retry = ops
+                    raise
+                try:
+                    for op in ops:
+                        self._apply(op)
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    self._retry = ops
+                    raise
+
+    def _apply(self, op):
+        kind, job_id = op[0], op[1]
+        if kind == "created":
+            _, _, agent, question, at = op
+            self._conn.execute(
+                "INSERT OR IGNORE INTO jobs (job_id, agent, question, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, agent, question, at, at),
+            )
+        elif kind == "phase":
+            _, _, phase, at = op
+            self._conn.execute("UPDATE jobs SET phase = ?, updated_at = ? WHERE job_id = ?", (phase, at, job_id))
+            self._conn.execute("INSERT INTO job_phases (job_id, phase, at) VALUES (?, ?, ?)", (job_id, phase, at))
+        elif kind == "finished":
+            _, _, outcome, at = op
+            self._conn.execute(
+                "UPDATE jobs SET outcome = ?, updated_at = ?, finished_at = ? WHERE job_id = ?",
+                (outcome, at, at, job_id),
+            )
+
+    def adopt(self, agents, source):
+        """Move `source`'s open jobs for the named agents into this journal, e.g. after VOLUME_WORKERS changed."""
+        rows = [r for r in source.unfinished() if r["agent"] in agents]
+        if not rows:
+            return 0
+        self.flush()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for r in rows:
+                    self._conn.execute(
+                        "INSERT OR IGNORE INTO jobs (job_id, agent, question, phase, created_at, updated_at)"
+                        " VALUES (?, ?, ?, ?, ?, ?)",
+                        (r["job_id"], r["agent"], r["question"], r["phase"], r["created_at"], r["updated_at"]))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        # Copied first: a crash in between leaves the job in both, and the next adopt() retries the delete.
+        with source._lock:
+            ids = [(r["job_id"],) for r in rows]
+            source._conn.executemany("DELETE FROM jobs WHERE job_id = ?", ids)
+            source._conn.executemany("DELETE FROM job_phases WHERE job_id = ?", ids)
+        return len(rows)
+
+    # -- reads --
+
+    def _rows(self, sql, args=()):
+        self.flush()
+        with self._lock:
+            cur = self._conn.execute(sql, args)
+            cols = [c[0] for c in cur.description]
+            return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+    def unfinished(self):
+        return self._rows("SELECT * FROM jobs WHERE outcome IS NULL ORDER BY created_at")
+
+    def get(self, job_id):
+        rows = self._rows("SELECT * FROM jobs WHERE job_id = ?", (str(job_id),))
+        if not rows:
+            return None
+        job = rows[0]
+        job["phases"] = self._rows("SELECT phase, at FROM job_phases WHERE job_id = ? ORDER BY at", (str(job_id),))
+        return job
+
+    def page(self, limit=50, offset=0, agent=None, status=None):
+        """Newest first. status: "open", "done", or an outcome ("completed", "failed", ...)."""
+        where, args = [], []
+        if agent:
+            where.append("agent = ?")
+            args.append(agent)
+        if status == "open":
+            where.append("outcome IS NULL")
+        elif status == "done":
+            where.append("outcome IS NOT NULL")
+        elif status:
+            where.append("outcome = ?")
+            args.append(status)
+        clause = f" WHERE {' AND '.join(where)}" if where else ""
+        total = self._rows(f"SELECT COUNT(*) AS n FROM jobs{clause}", args)[0]["n"]
+        jobs = self._rows(
+            f"SELECT * FROM jobs{clause} ORDER BY created_at DESC, job_id DESC LIMIT ? OFFSET ?",
+            args + [limit, offset],
+        )
+        next_offset = offset + len(jobs) if offset + len(jobs) < total else None
+        return {"jobs": jobs, "total": total, "limit": limit, "offset": offset, "next_offset": next_offset}
+
+
+_journals = {}
+_journal_lock = threading.Lock()
+
+
+def journal(path=None):
+    """The journal at `path`, by default the one this process writes."""
+    path = path or cfg.own_path(cfg.journal_file)
+    with _journal_lock:
+        j = _journals.get(path)
+        if j is None:
+            j = _journals[path] = JobJournal(path)
+            atexit.register(j.flush)
+        return j
+
+
+def siblings():
+    """Every other journal on disk: the main one and any volume worker's, whatever the worker count was."""
+    stem, ext = os.path.splitext(cfg.journal_file)
+    pattern = re.compile(re.escape(stem) + r"\.\d+" + re.escape(ext) + "$")
+    paths = [cfg.journal_file] + sorted(p for p in glob.glob(f"{glob.escape(stem)}.*{ext}") if pattern.match(p))
+    own = cfg.own_path(cfg.journal_file)
+    return [journal(p) for p in paths if p != own and os.path.exists(p)]
+
+
+def journals():
+    """Every journal holding this node's jobs: its own, plus each volume worker's."""
+    own = cfg.own_path(cfg.journal_file)
+    paths = [cfg.journal_file] + [worker_path(cfg.journal_file, i) for i in range(cfg.volume_workers)]
+    return [journal(p) for p in paths if p == own or os.path.exists(p)]
+
+
+def get(job_id):
+    for j in journals():
+        job = j.get(job_id)
+        if job is not None:
+            return job
+    return None
+
+
+def page(limit=50, offset=0, agent=None, status=None):
+    """JobJournal.page() across journals(), newest first."""
+    parts = [j.page(limit=offset + limit, offset=0, agent=agent, status=status) for j in journals()]
+    rows = sorted((r for p in parts for r in p["jobs"]), key=lambda r: (r["created_at"], r["job_id"]), reverse=True)
+    total = sum(p["total"] for p in parts)
+    jobs = rows[offset:offset + limit]
+    next_offset = offset + len(jobs) if offset + len(jobs) < total else None
+    return {"jobs": jobs, "total": total, "limit": limit, "offset": offset, "next_offset": next_offset}
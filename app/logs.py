@@ -0,0 +1,208 @@
+import atexit
+import gzip
+import json
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+
+from .config import cfg
+
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+
+
+class _RotatingGzipFile:
+    """Append-only file that is gzipped away once it exceeds max_bytes (path.1.gz is newest).
+
+    At least one backup is always kept: rotating must never delete records outright.
+    """
+
+    def __init__(self, path, max_bytes, backups):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = max(backups, 1)
+        self._f = None
+
+    def write(self, text):
+        if self._f is None:
+            self._f = open(self.path, "a", encoding="utf-8")
+        self._f.write(text)
+
+    def flush(self):
+        if self._f is None:
+            return
+        self._f.flush()
+        if self.max_bytes and self._f.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        self._f.close()
+        self._f = None
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}.gz"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}.gz")
+        with open(self.path, "rb") as src, gzip.open(f"{self.path}.1.gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(self.path)
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+
+class _Writer:
+    """Single background thread that drains the log queue and writes in batches.
+
+    When the queue is full, records are dropped and counted rather than blocking.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=cfg.log_queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._dropped = 0
+        self._sinks = {}
+
+    def _sink(self, name):
+        sink = self._sinks.get(name)
+        if sink is None:
+            if name == "deliverables":
+                sink = _RotatingGzipFile(cfg.own_path(cfg.deliverables_file), cfg.deliverables_max_bytes,
+                                         cfg.deliverables_backups)
+            else:
+                sink = sys.stdout
+            self._sinks[name] = sink
+        return sink
+
+    def put(self, sink, record):
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait((sink, record))
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=cfg.log_flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < cfg.log_batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = self._write(batch)
+            if stop:
+                return
+
+    def _write(self, batch):
+        with self._lock:
+            dropped, self._dropped = self._dropped, 0
+        if dropped:
+            batch.append(("main", _record("warning", "logs", f"dropped {dropped} log records (queue full)")))
+        out, stop = {}, False
+        for sink, record in batch:
+            if record is None:
+                stop = True
+                continue
+            out.setdefault(sink, []).append(_format(sink, record))
+        for sink, lines in out.items():
+            try:
+                s = self._sink(sink)
+                s.write("".join(lines))
+                s.flush()
+            except Exception as e:
+                sys.stderr.write(f"log writer: {sink} sink failed: {e}\n")
+        return stop
+
+    def close(self, timeout=5):
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put((None, None))
+        thread.join(timeout)
+        if thread.is_alive():
+            # Still writing: keep it as the writer and leave its sinks open.
+            return
+        with self._lock:
+            self._thread = None
+        for sink in self._sinks.values():
+            if isinstance(sink, _RotatingGzipFile):
+                sink.close()
+
+
+def _record(level, logger, msg, **fields):
+    return {"ts": round(time.time(), 3), "level": level, "logger": logger, "msg": msg, **fields}
+
+
+def _format(sink, record):
+    if sink == "main" and cfg.log_format == "text":
+        return record["msg"] + "\n"
+    return json.dumps(record, default=str) + "\n"
+
+
+_writer = _Writer()
+atexit.register(_writer.close)
+
+
+class Logger:
+    """log.info("msg", agent=..., job_id=...) -> one JSON line; extra kwargs become fields.
+
+    Pass sample=True on high-volume lines (polls, phase changes): only one in
+    every cfg.log_sample_every of them is kept per logger.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._sampled = 0
+
+    def _emit(self, level, msg, sample=False, **fields):
+        if LEVELS[level] < LEVELS.get(cfg.log_level, 20):
+            return
+        if sample and cfg.log_sample_every > 1:
+            # Racy increment is fine: sampling only needs to be roughly 1-in-N.
+            self._sampled += 1
+            if self._sampled % cfg.log_sample_every != 1:
+                return
+            fields["sampled"] = cfg.log_sample_every
+        _writer.put("main", _record(level, self.name, msg, **fields))
+
+    def debug(self, msg, **fields):
+        self._emit("debug", msg, **fields)
+
+    def info(self, msg, **fields):
+        self._emit("info", msg, **fields)
+
+    def warning(self, msg, **fields):
+        self._emit("warning", msg, **fields)
+
+    def error(self, msg, **fields):
+        self._emit("error", msg, **fields)
+
+
+def get_logger(name):
+    return Logger(name)
+
+
+def deliverable(agent, job_id, response, **fields):
+    """Record a job's deliverable in the deliverables sink, not the main log."""
+    _writer.put("deliverables", _record("info", "deliverables", "deliverable",
+                                        agent=agent, job_id=job_id, response=response, **fields))
+
+
+def close():
+    """Drain and stop the writer (also runs at exit)."""
+    _writer.close()
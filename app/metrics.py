@@ -0,0 +1,210 @@
+import math
+import threading
+import weakref
+
+# Prometheus text exposition without a client library. Writers only touch a
+# shard owned by their own thread, so the hot path takes no lock; a scrape
+# sums the shards.
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, math.inf)
+DURATION_BUCKETS = (1, 2, 5, 10, 20, 30, 60, 120, 300, math.inf)
+POLL_BUCKETS = (1, 2, 3, 5, 10, 20, 50, math.inf)
+
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def _fmt(v):
+    if v == math.inf:
+        return "+Inf"
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return repr(v) if isinstance(v, float) else str(v)
+
+
+def _label_str(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    esc = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, esc)) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        with _registry_lock:
+            _registry.append(self)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class _ShardHolder:
+    """Owns one thread's shard; collected when the thread's locals are."""
+
+    __slots__ = ("shard", "__weakref__")
+
+    def __init__(self):
+        self.shard = {}
+
+
+class _Sharded(_Metric):
+    """Per-thread dicts of label values -> value; merged on read.
+
+    When a thread exits its shard is folded into `_base`, so short-lived
+    threads don't leave a shard behind each.
+    """
+
+    def __init__(self, name, help, labels=()):
+        super().__init__(name, help, labels)
+        self._local = threading.local()
+        self._base = {}
+        self._shards = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self):
+        holder = getattr(self._local, "holder", None)
+        if holder is None:
+            holder = self._local.holder = _ShardHolder()
+            with self._shards_lock:
+                self._shards.append(holder.shard)
+            weakref.finalize(holder, self._retire, holder.shard)
+        return holder.shard
+
+    def _retire(self, shard):
+        with self._shards_lock:
+            self._shards = [s for s in self._shards if s is not shard]
+            for key, v in shard.items():
+                self._base[key] = self._fold(self._base.get(key), v)
+
+    def _fold(self, acc, v):
+        raise NotImplementedError
+
+    def _snapshot(self):
+        # Under the lock so a shard being retired is counted exactly once.
+        with self._shards_lock:
+            return [dict(self._base)] + [dict(s) for s in self._shards]
+
+
+class Counter(_Sharded):
+    kind = "counter"
+
+    def inc(self, *labels, n=1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + n
+
+    def _fold(self, acc, v):
+        return (acc or 0) + v
+
+    def values(self):
+        out = {}
+        for shard in self._snapshot():
+            for key, v in shard.items():
+                out[key] = out.get(key, 0) + v
+        return out
+
+    def _samples(self):
+        return [f"{self.name}{_label_str(self.labels, k)} {_fmt(v)}" for k, v in sorted(self.values().items())]
+
+
+class Histogram(_Sharded):
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets, labels=()):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        if self.buckets[-1] != math.inf:
+            self.buckets += (math.inf,)
+
+    def observe(self, value, *labels):
+        shard = self._shard()
+        row = shard.get(labels)
+        if row is None:
+            # [per-bucket counts..., sum, count]
+            row = shard[labels] = [0] * len(self.buckets) + [0.0, 0]
+        for i, le in enumerate(self.buckets):
+            if value <= le:
+                row[i] += 1
+                break
+        row[-2] += value
+        row[-1] += 1
+
+    def _fold(self, acc, row):
+        # A fresh list: rows already in _base are never mutated after a snapshot.
+        return list(row) if acc is None else [a + b for a, b in zip(acc, row)]
+
+    def values(self):
+        """{labels: {"buckets": {le: cumulative}, "sum": s, "count": n}}"""
+        merged = {}
+        for shard in self._snapshot():
+            for key, row in shard.items():
+                acc = merged.setdefault(key, [0] * len(row))
+                for i, v in enumerate(list(row)):
+                    acc[i] += v
+        out = {}
+        for key, row in merged.items():
+            cumulative, buckets = 0, {}
+            for le, c in zip(self.buckets, row):
+                cumulative += c
+                buckets[le] = cumulative
+            out[key] = {"buckets": buckets, "sum": row[-2], "count": row[-1]}
+        return out
+
+    def _samples(self):
+        lines = []
+        for key, h in sorted(self.values().items()):
+            for le, c in h["buckets"].items():
+                lines.append(f"{self.name}_bucket{_label_str(self.labels, key, [('le', _fmt(le))])} {c}")
+            lines.append(f"{self.name}_sum{_label_str(self.labels, key)} {_fmt(round(h['sum'], 6))}")
+            lines.append(f"{self.name}_count{_label_str(self.labels, key)} {h['count']}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Read at scrape time from `fn`, which returns a number or {label values: number}."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help, fn, labels=()):
+        super().__init__(name, help, labels)
+        self._fn = fn
+
+    def _samples(self):
+        v = self._fn()
+        if not isinstance(v, dict):
+            v = {(): v}
+        return [f"{self.name}{_label_str(self.labels, k)} {_fmt(n)}" for k, n in sorted(v.items())]
+
+
+def render():
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for m in metrics:
+        lines.extend(m.render())
+    return "\n".join(lines) + "\n"
+
+
+# -- metrics shared across modules --
+
+http_request_seconds = Histogram(
+    "acp_bot_http_request_seconds", "Upstream HTTP request latency.", LATENCY_BUCKETS, ("service", "endpoint"))
+http_request_errors = Counter(
+    "acp_bot_http_request_errors_total", "Upstream HTTP requests that raised or returned >= 400.",
+    ("service", "endpoint"))
+jobs_created = Counter("acp_bot_jobs_created_total", "Jobs created, per agent.", ("agent",))
+jobs_finished = Counter("acp_bot_jobs_total", "Jobs by final outcome, per agent.", ("agent", "outcome"))
+create_job_seconds = Histogram(
+    "acp_bot_create_job_seconds", "Latency of the create-job call.", LATENCY_BUCKETS)
+job_completion_seconds = Histogram(
+    "acp_bot_job_completion_seconds", "Time from job creation to COMPLETED.", DURATION_BUCKETS)
+job_phase_seconds = Histogram(
+    "acp_bot_job_phase_seconds", "Estimated time a job spends in each phase.", DURATION_BUCKETS, ("phase",))
+job_polls = Histogram("acp_bot_job_polls", "Status polls needed per job.", POLL_BUCKETS)
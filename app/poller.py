@@ -0,0 +1,309 @@
+import asyncio
+import math
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from . import acp, breaker, logs, metrics
+from .config import cfg
+from .events import job_events
+
+MAX_POLL_ERRORS = 5
+
+
+log = logs.get_logger("poller")
+
+
+class TimerWheel:
+    """Hashed timer wheel: O(1) schedule, one slot scanned per tick."""
+
+    def __init__(self, tick, slots):
+        self.tick = tick
+        self._slots = [[] for _ in range(slots)]
+        self._cursor = 0
+
+    def schedule(self, item, delay):
+        ticks = max(1, math.ceil(delay / self.tick))
+        n = len(self._slots)
+        self._slots[(self._cursor + ticks) % n].append([(ticks - 1) // n, item])
+
+    def advance(self):
+        self._cursor = (self._cursor + 1) % len(self._slots)
+        due, keep = [], []
+        for entry in self._slots[self._cursor]:
+            if entry[0] == 0:
+                due.append(entry[1])
+            else:
+                entry[0] -= 1
+                keep.append(entry)
+        self._slots[self._cursor] = keep
+        return due
+
+
+class PhaseModel:
+    """Learns how long jobs sit in each phase (EWMA); durations also feed metrics.job_phase_seconds."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._expected = {}
+
+    def observe(self, phase, seconds):
+        with self._lock:
+            prev = self._expected.get(phase)
+            a = cfg.poll_learning_rate
+            self._expected[phase] = seconds if prev is None else prev + a * (seconds - prev)
+        metrics.job_phase_seconds.observe(seconds, phase)
+
+    def expected(self, phase):
+        return self._expected.get(phase)
+
+    def stats(self):
+        with self._lock:
+            expected = dict(self._expected)
+        out = {}
+        for (phase,), h in metrics.job_phase_seconds.values().items():
+            out[phase] = {
+                "count": h["count"],
+                "sum": round(h["sum"], 3),
+                "expected_sec": round(expected.get(phase, 0), 3),
+                "buckets": {"+Inf" if le == math.inf else str(le): c for le, c in h["buckets"].items()},
+            }
+        return out
+
+
+class _Job:
+    __slots__ = ("agent", "job_id", "future", "deadline", "phase", "phase_since", "last_seen",
+                 "overdue_polls", "poll_errors", "polls", "gen", "busy", "rewake")
+
+    def __init__(self, agent, job_id, created_at=None):
+        now = time.time()
+        self.agent = agent
+        self.job_id = job_id
+        self.future = Future()
+        self.deadline = (created_at or now) + cfg.job_timeout_sec
+        self.phase = None
+        self.phase_since = now
+        self.last_seen = now
+        self.overdue_polls = 0
+        self.poll_errors = 0
+        self.polls = 0
+        self.gen = 0
+        self.busy = False
+        self.rewake = False
+
+
+class Poller:
+    """Central poll scheduler for every outstanding job.
+
+    Jobs sit on a timer wheel and are polled when the learned duration of
+    their phase says they're due; a socket event pulls the next poll forward.
+    """
+
+    def __init__(self, check):
+        self._check = check
+        self._lock = threading.Lock()
+        self._wheel = TimerWheel(cfg.poll_tick, cfg.poll_wheel_slots)
+        self._jobs = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self.model = PhaseModel()
+        self._polls = 0
+        job_events.add_listener(self.wake)
+
+    # -- registration --
+
+    def track(self, agent, job_id, created_at=None):
+        """Start watching job_id; returns a Future resolving to the outcome (None if stopped)."""
+        job = _Job(agent, job_id, created_at)
+        with self._lock:
+            self._jobs[str(job_id)] = job
+            self._wheel.schedule((job, job.gen), 0)
+        job_events.track(job_id)
+        job_events.watch(agent)
+        return job.future
+
+    def wake(self, job_id):
+        """Poll job_id on the next tick (called on socket events)."""
+        with self._lock:
+            job = self._jobs.get(str(job_id))
+            if job is None:
+                return
+            if job.busy:
+                # The poll in flight may have read the status before this event; poll again right after it.
+                job.rewake = True
+                return
+            job.gen += 1
+            self._wheel.schedule((job, job.gen), 0)
+
+    def _reschedule(self, job, delay):
+        with self._lock:
+            if job.rewake:
+                delay, job.rewake = 0, False
+            job.busy = False
+            job.gen += 1
+            self._wheel.schedule((job, job.gen), delay)
+
+    def _resolve(self, job, outcome):
+        with self._lock:
+            self._jobs.pop(str(job.job_id), None)
+        if outcome is not None:
+            metrics.job_polls.observe(job.polls)
+        job_events.forget(job.job_id)
+        if not job.future.done():
+            job.future.set_result(outcome)
+
+    def _due(self):
+        with self._lock:
+            due = []
+            for job, gen in self._wheel.advance():
+                if gen != job.gen or job.busy or str(job.job_id) not in self._jobs:
+                    continue
+                job.busy = True
+                due.append(job)
+            return due
+
+    # -- per-poll bookkeeping --
+
+    def _next_delay(self, job, now):
+        expected = self.model.expected(job.phase) if job.phase else None
+        in_phase = now - job.phase_since
+        if expected is not None and in_phase < expected:
+            delay = expected - in_phase
+            job.overdue_polls = 0
+        else:
+            delay = cfg.poll_min_interval * (cfg.poll_backoff ** job.overdue_polls)
+            job.overdue_polls += 1
+        delay = min(max(delay, cfg.poll_min_interval), cfg.poll_max_interval)
+        if job_events.connected(job.agent):
+            delay = max(delay, cfg.event_fallback_poll_interval)
+        return min(delay, max(job.deadline - now, 0))
+
+    def _handle(self, job, data, err):
+        name = job.agent["name"]
+        now = time.time()
+        job.polls += 1
+        with self._lock:
+            self._polls += 1
+
+        phase = outcome = None
+        if not err:
+            try:
+                phase, outcome = self._check(job.agent, job.job_id, data, job.phase)
+            except Exception as e:
+                # A payload we can't read counts as a failed poll; the job stays scheduled.
+                err = f"unreadable status ({type(e).__name__}: {e})"
+
+        if err and breaker.get("acp").state != breaker.CLOSED and now < job.deadline:
+            # Wait out the breaker without spending the job's error budget, but not past its deadline.
+            self._reschedule(job, min(max(breaker.get("acp").retry_in(), cfg.poll_interval), job.deadline - now))
+            return
+        if err:
+            job.poll_errors += 1
+            log.warning(f"[{name}] Job {job.job_id} poll error ({job.poll_errors}): {err}", agent=name, job_id=job.job_id)
+            if job.poll_errors >= MAX_POLL_ERRORS:
+                log.error(f"[{name}] Job {job.job_id} too many poll errors, giving up", agent=name, job_id=job.job_id)
+                return self._resolve(job, "errors")
+        else:
+            job.poll_errors = 0
+            prev = job.phase
+            if phase != prev:
+                if prev is not None:
+                    # The transition happened somewhere between the last two polls.
+                    self.model.observe(prev, (job.last_seen + now) / 2 - job.phase_since)
+                job.phase = phase
+                job.phase_since = (job.last_seen + now) / 2 if prev is not None else now
+                job.overdue_polls = 0
+            job.last_seen = now
+            if outcome:
+                return self._resolve(job, outcome)
+
+        if now >= job.deadline:
+            log.warning(f"[{name}] Job {job.job_id} TIMEOUT (last phase: {job.phase})", agent=name, job_id=job.job_id, phase=job.phase)
+            return self._resolve(job, "timeout")
+
+        self._reschedule(job, cfg.poll_interval if err else self._next_delay(job, now))
+
+    # -- drivers --
+
+    def _reset_wheel(self):
+        # Pick up tick/slot changes made to cfg since construction.
+        with self._lock:
+            if not self._jobs:
+                self._wheel = TimerWheel(cfg.poll_tick, cfg.poll_wheel_slots)
+
+    def start(self):
+        """Run the wheel on a background thread, polling through a worker pool."""
+        if self._thread and self._thread.is_alive():
+            if not self._stop.is_set():
+                return
+            self._thread.join()
+        self._reset_wheel()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        with ThreadPoolExecutor(max_workers=cfg.poll_workers) as pool:
+            next_tick = time.monotonic()
+            while not self._stop.is_set():
+                for job in self._due():
+                    pool.submit(self._poll_sync, job)
+                next_tick += self._wheel.tick
+                self._stop.wait(max(next_tick - time.monotonic(), 0))
+        self._abandon()
+
+    def _settle(self, job, data, err):
+        # Nothing may escape a poll: a job that is neither rescheduled nor resolved would block its lane forever.
+        try:
+            self._handle(job, data, err)
+        except Exception as e:
+            name = job.agent["name"]
+            log.error(f"[{name}] Job {job.job_id} poll handling failed: {e}", agent=name, job_id=job.job_id)
+            self._resolve(job, "errors")
+
+    def _poll_sync(self, job):
+        data, err = acp.job_status(job.agent, job.job_id)
+        self._settle(job, data, err)
+
+    async def run_async(self):
+        """Drive the wheel from an event loop; due polls in a tick run concurrently."""
+        self._reset_wheel()
+        self._stop.clear()
+        inflight = set()
+        try:
+            next_tick = time.monotonic()
+            while not self._stop.is_set():
+                for job in self._due():
+                    task = asyncio.create_task(self._poll_async(job))
+                    inflight.add(task)
+                    task.add_done_callback(inflight.discard)
+                next_tick += self._wheel.tick
+                await asyncio.sleep(max(next_tick - time.monotonic(), 0))
+        finally:
+            for task in inflight:
+                task.cancel()
+            self._abandon()
+
+    async def _poll_async(self, job):
+        data, err = await acp.job_status_async(job.agent, job.job_id)
+        self._settle(job, data, err)
+
+    def stop(self):
+        self._stop.set()
+
+    def _abandon(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            self._resolve(job, None)
+
+    def tracked(self):
+        return len(self._jobs)
+
+    def tracking(self, job_id):
+        return str(job_id) in self._jobs
+
+    def stats(self):
+        with self._lock:
+            tracked, polls = len(self._jobs), self._polls
+        return {"tracked_jobs": tracked, "polls": polls, "phases": self.model.stats()}
@@ -0,0 +1,191 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .acp import run_cli
+from . import logs
+from .config import cfg
+from .privy import get_client
+from .ratelimit import TokenBucket
+from .wallets import get_wallet, load_wallets, upsert_wallet
+
+AGENT_NAMES = ["celesty", "Viktor", "Jansen-huang"]
+
+_run_lock = threading.Lock()
+# `agent create` and `agent switch` read-modify-write the CLI's one config.json, and
+# _read_cli_api_key() reads it back. These run one at a time whatever the worker count.
+_cli_config_lock = threading.Lock()
+_progress_lock = threading.Lock()
+_progress = {"running": False}
+
+
+log = logs.get_logger("setup")
+
+
+def agent_name(idx):
+    return AGENT_NAMES[idx] if idx < len(AGENT_NAMES) else f"acp-client-{idx + 1:02d}"
+
+
+def _bump(key, n=1):
+    with _progress_lock:
+        _progress[key] += n
+
+
+def progress():
+    with _progress_lock:
+        return dict(_progress, errors=list(_progress.get("errors", [])))
+
+
+def _read_cli_api_key():
+    path = os.path.join(cfg.acp_cli_path, "config.json")
+    try:
+        with open(path) as f:
+            return json.load(f).get("LITE_AGENT_API_KEY")
+    except (OSError, ValueError):
+        return None
+
+
+def _server_agents():
+    """{name: agent} as listed by ACP, or None if the list call failed."""
+    server, err = run_cli("agent", "list")
+    if err or not isinstance(server, list):
+        log.warning(f"[setup] Could not list ACP agents: {err}")
+        return None
+    return {a.get("name"): a for a in server}
+
+
+def _recover_key(name):
+    """(api_key, err) for an agent that exists on ACP; `agent switch` regenerates its key."""
+    with _cli_config_lock:
+        data, err = run_cli("agent", "switch", name)
+        api_key = _read_cli_api_key() if not err else None
+    return api_key, err
+
+
+def _provision(privy, limiter, name, server, cancel=None):
+    """Bring agent `name` to a wallet plus an API key; safe to rerun after any partial failure."""
+    if cancel is not None and cancel.is_set():
+        return {"name": name, "error": "cancelled"}
+    _bump("in_progress")
+    try:
+        record = get_wallet(name) or {"name": name}
+        if record.get("acp_api_key"):
+            return None
+        if not record.get("privy_wallet_id"):
+            limiter.acquire()
+            wallet = privy.create_wallet()
+            record = {**record, "privy_wallet_id": wallet["id"], "privy_address": wallet["address"]}
+            # Checkpoint before the ACP call so a crash here resumes instead of minting a second wallet.
+            upsert_wallet(record)
+
+        existing = (server or {}).get(name)
+        if existing:
+            api_key, err = _recover_key(name)
+            if not api_key:
+                raise Exception(f"ACP agent exists but key recovery failed: {err}")
+            upsert_wallet({"name": name, "acp_wallet": existing.get("walletAddress"), "acp_api_key": api_key})
+            _bump("reconciled")
+            log.info(f"[setup] {name} reconciled with existing ACP agent")
+            return None
+
+        limiter.acquire()
+        with _cli_config_lock:
+            acp_data, err = run_cli("agent", "create", name)
+        if err or not isinstance(acp_data, dict) or not acp_data.get("apiKey"):
+            raise Exception(f"ACP agent: {err or 'no API key returned'}")
+        upsert_wallet({"name": name, "acp_wallet": acp_data.get("walletAddress"), "acp_api_key": acp_data["apiKey"]})
+        _bump("created")
+        log.info(f"[setup] {name} provisioned")
+        return None
+    except Exception as e:
+        _bump("failed")
+        log.error(f"[setup] {name} failed: {e}", agent=name)
+        return {"name": name, "error": str(e)}
+    finally:
+        _bump("in_progress", -1)
+
+
+def _missing_names(taken, count):
+    """The `count` lowest-numbered agent names not in `taken`, so a gap left by a failure is filled first."""
+    names, i = [], 0
+    while len(names) < count:
+        if agent_name(i) not in taken:
+            names.append(agent_name(i))
+        i += 1
+    return names
+
+
+def do_setup(cancel=None):
+    """Create wallets + ACP agents up to cfg.num_agents; resumes partially created ones.
+
+    Setting the `cancel` event stops it from starting further agents.
+    """
+    if not _run_lock.acquire(blocking=False):
+        return {"ok": False, "error": "setup already running"}
+    try:
+        return _do_setup(cancel)
+    finally:
+        with _progress_lock:
+            _progress["running"] = False
+            _progress["finished_at"] = time.time()
+        _run_lock.release()
+
+
+def _do_setup(cancel=None):
+    try:
+        privy = get_client()
+    except ValueError as e:
+        return {"ok": False, "error": str(e)}
+
+    wallets = load_wallets()
+    incomplete = [w["name"] for w in wallets if not w.get("acp_api_key")]
+    missing = max(cfg.num_agents - len(wallets), 0)
+
+    with _progress_lock:
+        _progress.clear()
+        _progress.update({
+            "running": True,
+            "started_at": time.time(),
+            "finished_at": None,
+            "target": missing + len(incomplete),
+            "created": 0,
+            "reconciled": 0,
+            "failed": 0,
+            "in_progress": 0,
+            "errors": [],
+        })
+
+    if not missing and not incomplete:
+        return {"ok": True, "message": f"Already have {len(wallets)} wallets.", "wallets": len(wallets)}
+
+    if incomplete:
+        log.info(f"[setup] Resuming {len(incomplete)} partially created agents")
+    pending = incomplete + _missing_names({w.get("name") for w in wallets}, missing)
+    # Agents that already exist on ACP (an earlier run got that far) are recovered, not created twice.
+    server = _server_agents()
+    limiter = TokenBucket(cfg.setup_rate_per_sec, burst=cfg.setup_concurrency)
+
+    errors = []
+    if pending:
+        with ThreadPoolExecutor(max_workers=max(1, min(cfg.setup_concurrency, len(pending)))) as pool:
+            for err in pool.map(lambda n: _provision(privy, limiter, n, server, cancel), pending):
+                if err:
+                    errors.append(err)
+                    with _progress_lock:
+                        _progress["errors"] = errors[:10]
+
+    p = progress()
+    message = f"Created {p['created']} agents."
+    if p["reconciled"]:
+        message += f" Reconciled {p['reconciled']}."
+    if errors:
+        message += f" {len(errors)} failed."
+    return {
+        "ok": not errors,
+        "message": message,
+        "wallets": len(load_wallets()),
+        "failed": len(errors),
+        "errors": errors[:10],
+    }
@@ -1,4 +1,12 @@
+import json
+import os
 import random
+import string
+import threading
+from collections import deque
+
+from . import logs
+from .config import cfg
 
 QUESTIONS = [
     "What are the top volume movers on Base in the last 24 hours and what's driving the flow?",
@@ -14,5 +22,244 @@ QUESTIONS = [
 ]
 
 
-def get_random_question():
-    return random.choice(QUESTIONS)
+log = logs.get_logger("questions")
+
+
+class AliasSampler:
+    """Vose's alias method: O(n) to build, O(1) per weighted draw."""
+
+    def __init__(self, weights):
+        n = len(weights)
+        total = float(sum(weights))
+        if n == 0 or total <= 0:
+            raise ValueError("need at least one positive weight")
+        scaled = [w * n / total for w in weights]
+        self._prob = [0.0] * n
+        self._alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self._prob[s] = scaled[s]
+            self._alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        # Leftovers are 1.0 up to rounding.
+        for i in small + large:
+            self._prob[i] = 1.0
+
+    def __len__(self):
+        return len(self._prob)
+
+    def draw(self, rng=random):
+        i = int(rng.random() * len(self._prob))
+        return i if rng.random() < self._prob[i] else self._alias[i]
+
+
+class _Entry:
+    __slots__ = ("text", "weight", "vars", "fields")
+
+    def __init__(self, text, weight=1.0, variables=None):
+        self.text = text
+        self.weight = float(weight)
+        fields = {f for _, f, _, _ in string.Formatter().parse(text) if f}
+        variables = variables or {}
+        # Only a template if every placeholder has values; anything else is literal text.
+        self.fields = tuple(sorted(fields)) if fields and fields <= set(variables) else ()
+        self.vars = {f: list(variables[f]) for f in self.fields}
+
+    def render(self, rng=random):
+        if not self.fields:
+            return self.text
+        return self.text.format(**{f: rng.choice(self.vars[f]) for f in self.fields})
+
+
+def _valid_vars(variables):
+    """vars must map names to non-empty lists of strings."""
+    return isinstance(variables, dict) and all(
+        isinstance(name, str) and isinstance(values, list) and values and all(isinstance(v, str) for v in values)
+        for name, values in variables.items())
+
+
+def _parse_items(items, file_vars=None, source=""):
+    """Entries for the valid items; anything malformed is skipped with a warning."""
+    if file_vars is not None and not _valid_vars(file_vars):
+        log.warning(f"[questions] Ignoring bad vars in {source}: {str(file_vars)[:80]}")
+        file_vars = None
+    entries = []
+    for item in items:
+        if isinstance(item, str):
+            item = {"text": item}
+        entry = None
+        if isinstance(item, dict):
+            text = item.get("text")
+            weight = item.get("weight", 1.0)
+            variables = item.get("vars")
+            if (isinstance(text, str) and text.strip()
+                    and isinstance(weight, (int, float)) and not isinstance(weight, bool) and weight > 0
+                    and (variables is None or _valid_vars(variables))):
+                try:
+                    entry = _Entry(text.strip(), weight, {**(file_vars or {}), **(variables or {})})
+                    entry.render()  # a template that can't format fails here, not on a draw
+                except (ValueError, KeyError, IndexError, AttributeError):
+                    entry = None
+        if entry is None:
+            log.warning(f"[questions] Skipping bad entry in {source}: {str(item)[:80]}")
+            continue
+        entries.append(entry)
+    return entries
+
+
+def load_file(path):
+    """Entries from one question file.
+
+    .txt    one question per line, '#' comments
+    .json   a list of strings/objects, or {"vars": {...}, "questions": [...]}
+    .jsonl  one string or object per line
+    Objects are {"text", "weight", "vars"}; {name} placeholders in the text
+    are filled from vars (per entry, else the file's) on every draw.
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            return _parse_items(_jsonl_items(f, path), source=path)
+        if path.endswith(".json"):
+            data = json.load(f)
+            file_vars = None
+            if isinstance(data, dict):
+                data, file_vars = data.get("questions") or [], data.get("vars")
+            if not isinstance(data, list):
+                raise ValueError("expected a list of questions")
+            return _parse_items(data, file_vars, source=path)
+        return _parse_items([line for line in (l.strip() for l in f) if line and not line.startswith("#")],
+                            source=path)
+
+
+def _jsonl_items(f, source):
+    items = []
+    for n, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            items.append(json.loads(line))
+        except ValueError as e:
+            log.warning(f"[questions] Skipping bad line {n} in {source}: {e}")
+    return items
+
+
+def _paths(spec):
+    """Files named by a comma-separated list of files and directories."""
+    out = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        if os.path.isdir(part):
+            out.extend(os.path.join(part, n) for n in sorted(os.listdir(part))
+                       if n.endswith((".txt", ".json", ".jsonl")))
+        else:
+            out.append(part)
+    return out
+
+
+class QuestionCatalog:
+    """Weighted question source with per-agent spread.
+
+    Draws are O(1) through an alias table; a draw that repeats one of the
+    agent's last question_recent picks is redrawn up to question_redraws times.
+    """
+
+    def __init__(self, entries, sources=()):
+        if not entries:
+            raise ValueError("empty question catalog")
+        self.entries = entries
+        self.sources = list(sources)
+        self._sampler = AliasSampler([e.weight for e in entries])
+        self._lock = threading.Lock()
+        self._recent = {}
+        self._draws = [0] * len(entries)
+        self._repeats = 0
+
+    def _window(self):
+        return min(cfg.question_recent, len(self.entries) - 1)
+
+    def draw(self, agent=None, rng=random):
+        i = self._sampler.draw(rng)
+        window = self._window() if agent else 0
+        with self._lock:
+            if window > 0:
+                recent = self._recent.get(agent)
+                if recent is None:
+                    recent = self._recent[agent] = (deque(), set())
+                order, seen = recent
+                for _ in range(cfg.question_redraws):
+                    if i not in seen:
+                        break
+                    i = self._sampler.draw(rng)
+                else:
+                    if i in seen:
+                        self._repeats += 1
+                order.append(i)
+                seen.add(i)
+                while len(order) > window:
+                    seen.discard(order.popleft())
+            self._draws[i] += 1
+        return self.entries[i].render(rng)
+
+    def stats(self):
+        with self._lock:
+            draws = list(self._draws)
+            repeats = self._repeats
+            agents = len(self._recent)
+        total = sum(draws)
+        covered = sum(1 for d in draws if d)
+        return {
+            "sources": self.sources,
+            "questions": len(self.entries),
+            "templates": sum(1 for e in self.entries if e.fields),
+            "draws": total,
+            "covered": covered,
+            "coverage": round(covered / len(draws), 4),
+            "max_draws": max(draws),
+            "recent_repeats": repeats,
+            "agents": agents,
+        }
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def _build():
+    paths = _paths(cfg.questions_file) if cfg.questions_file else []
+    entries = []
+    for path in paths:
+        try:
+            entries.extend(load_file(path))
+        except Exception as e:
+            # One bad file (unreadable, malformed, unexpected shape) must not take the catalog down.
+            log.error(f"[questions] Could not load {path}: {e}")
+    if not entries:
+        if paths:
+            log.warning("[questions] No questions loaded from QUESTIONS_FILE, using the built-in set")
+        return QuestionCatalog(_parse_items(QUESTIONS), ["builtin"])
+    log.info(f"[questions] Loaded {len(entries)} questions from {len(paths)} files")
+    return QuestionCatalog(entries, paths)
+
+
+def catalog():
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = _build()
+        return _catalog
+
+
+def reload():
+    """Re-read QUESTIONS_FILE; returns the new catalog's stats."""
+    global _catalog
+    fresh = _build()
+    with _catalog_lock:
+        _catalog = fresh
+    return fresh.stats()
+
+
+def get_random_question(agent=None):
+    """A weighted question; with an agent name, avoids that agent's recent picks."""
+    return catalog().draw(agent)
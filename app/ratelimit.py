@@ -0,0 +1,60 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, up to `burst` saved up.
+
+    Thread-safe; acquire() blocks until a token is free. Rate and burst can
+    be changed while callers are waiting.
+    """
+
+    def __init__(self, rate, burst=1):
+        self._cond = threading.Condition()
+        self.rate = float(rate)
+        self.burst = float(max(burst, 1))
+        self._tokens = self.burst
+        self._stamp = time.monotonic()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def set_rate(self, rate, burst=None):
+        with self._cond:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
+            if burst is not None:
+                self.burst = float(max(burst, 1))
+                self._tokens = min(self._tokens, self.burst)
+            self._cond.notify_all()
+
+    def try_acquire(self):
+        """Take a token if one is available. Returns (ok, seconds until the next token)."""
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True, 0.0
+            if self.rate <= 0:
+                return False, None
+            return False, (1 - self._tokens) / self.rate
+
+    def acquire(self, stop=None, timeout=None):
+        """Block for a token. Returns False if `stop` (an Event) is set or timeout passes first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if stop is not None and stop.is_set():
+                return False
+            ok, wait = self.try_acquire()
+            if ok:
+                return True
+            wait = 1.0 if wait is None else min(wait, 1.0)
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            with self._cond:
+                self._cond.wait(wait)
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from .config import cfg, worker_path
+
+
+def question_key(question):
+    return hashlib.sha256(" ".join(question.split()).lower().encode()).hexdigest()[:32]
+
+
+class ResultStore:
+    """Paid deliverables kept for reuse (SQLite, WAL).
+
+    Bodies are zlib-compressed and stored once per content hash; each
+    (question, time bucket) row points at a body. Rows are evicted least
+    recently read first once the stored bodies exceed result_store_max_bytes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS blobs ("
+            " hash TEXT PRIMARY KEY,"
+            " data BLOB NOT NULL,"
+            " size INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " qkey TEXT NOT NULL,"
+            " bucket INTEGER NOT NULL,"
+            " question TEXT NOT NULL,"
+            " hash TEXT NOT NULL,"
+            " job_id TEXT,"
+            " agent TEXT,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL,"
+            " PRIMARY KEY (qkey, bucket))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results(accessed_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_hash ON results(hash)")
+        self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        self._stats = {"stored": 0, "deduplicated": 0, "evicted": 0, "hits": 0, "misses": 0}
+
+    def put(self, question, response, job_id=None, agent=None):
+        text = response if isinstance(response, str) else json.dumps(response, sort_keys=True)
+        raw = text.encode()
+        digest = hashlib.sha256(raw).hexdigest()
+        now = time.time()
+        bucket = int(now // cfg.result_bucket_sec)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self._conn.execute("SELECT 1 FROM blobs WHERE hash = ?", (digest,)).fetchone():
+                    self._stats["deduplicated"] += 1
+                else:
+                    data = zlib.compress(raw, 6)
+                    self._conn.execute("INSERT INTO blobs (hash, data, size) VALUES (?, ?, ?)",
+                                       (digest, data, len(data)))
+                    self._bytes += len(data)
+                qkey = question_key(question)
+                prev = self._conn.execute("SELECT hash FROM results WHERE qkey = ? AND bucket = ?",
+                                          (qkey, bucket)).fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO results"
+                    " (qkey, bucket, question, hash, job_id, agent, created_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (qkey, bucket, question, digest,
+                     None if job_id is None else str(job_id), agent, now, now),
+                )
+                if prev and prev[0] != digest:
+                    self._drop_orphan(prev[0])
+                self._evict()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._stats["stored"] += 1
+        return digest
+
+    def _evict(self):
+        # LRU rows out until under budget; each evicted row may free its body.
+        while self._bytes > cfg.result_store_max_bytes:
+            rows = self._conn.execute(
+                "SELECT qkey, bucket, hash FROM results ORDER BY accessed_at LIMIT 64").fetchall()
+            if not rows:
+                break
+            self._conn.executemany("DELETE FROM results WHERE qkey = ? AND bucket = ?",
+                                   [(q, b) for q, b, _ in rows])
+            self._stats["evicted"] += len(rows)
+            for digest in {h for _, _, h in rows}:
+                self._drop_orphan(digest)
+
+    def _drop_orphan(self, digest):
+        """Delete the body `digest` if no row points at it any more (an index lookup, not a scan)."""
+        row = self._conn.execute(
+            "SELECT size FROM blobs WHERE hash = ? AND NOT EXISTS (SELECT 1 FROM results WHERE hash = ?)",
+            (digest, digest)).fetchone()
+        if row:
+            self._conn.execute("DELETE FROM blobs WHERE hash = ?", (digest,))
+            self._bytes -= row[0]
+
+    def latest(self, question, max_age=None):
+        """Newest stored answer for `question` (optionally no older than max_age seconds), or None."""
+        qkey = question_key(question)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT r.bucket, r.question, r.hash, r.job_id, r.agent, r.created_at, b.data"
+                " FROM results r JOIN blobs b ON b.hash = r.hash"
+                " WHERE r.qkey = ? ORDER BY r.bucket DESC LIMIT 1", (qkey,)).fetchone()
+            if row is None or (max_age is not None and time.time() - row[5] > max_age):
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            self._conn.execute("UPDATE results SET accessed_at = ? WHERE qkey = ? AND bucket = ?",
+                               (time.time(), qkey, row[0]))
+        return {
+            "question": row[1],
+            "response": zlib.decompress(row[6]).decode(),
+            "hash": row[2],
+            "job_id": row[3],
+            "agent": row[4],
+            "created_at": row[5],
+        }
+
+    def questions(self):
+        """Latest entry per question, without bodies."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT question, hash, job_id, agent, MAX(created_at), COUNT(*) FROM results GROUP BY qkey"
+                " ORDER BY MAX(created_at) DESC").fetchall()
+        return [{"question": q, "hash": h, "job_id": j, "agent": a, "created_at": t, "buckets": n}
+                for q, h, j, a, t, n in rows]
+
+    def stats(self):
+        with self._lock:
+            s = dict(self._stats)
+            entries = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            blobs, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+            s.update(entries=entries, blobs=blobs, bytes=size, max_bytes=cfg.result_store_max_bytes)
+        lookups = s["hits"] + s["misses"]
+        s["hit_rate"] = round(s["hits"] / lookups, 4) if lookups else None
+        return s
+
+
+_stores = {}
+_store_lock = threading.Lock()
+
+
+def results(path=None):
+    """The store at `path`, by default the one this process writes."""
+    path = path or cfg.own_path(cfg.results_file)
+    with _store_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = ResultStore(path)
+        return store
+
+
+def stores():
+    """Every store holding this node's results: its own, plus each volume worker's."""
+    own = cfg.own_path(cfg.results_file)
+    paths = [cfg.results_file] + [worker_path(cfg.results_file, i) for i in range(cfg.volume_workers)]
+    return [results(p) for p in paths if p == own or os.path.exists(p)]
+
+
+def latest(question, max_age=None):
+    hits = [h for h in (s.latest(question, max_age=max_age) for s in stores()) if h]
+    return max(hits, key=lambda h: h["created_at"], default=None)
+
+
+def questions():
+    merged = {}
+    for s in stores():
+        for q in s.questions():
+            prev = merged.get(question_key(q["question"]))
+            if prev is None or q["created_at"] > prev["created_at"]:
+                merged[question_key(q["question"])] = dict(q, buckets=q["buckets"] + (prev["buckets"] if prev else 0))
+            else:
+                prev["buckets"] += q["buckets"]
+    return sorted(merged.values(), key=lambda q: q["created_at"], reverse=True)
+
+
+def stats():
+    out = {}
+    for s in stores():
+        for k, v in s.stats().items():
+            if k not in ("max_bytes", "hit_rate"):
+                out[k] = out.get(k, 0) + v
+    out["max_bytes"] = cfg.result_store_max_bytes
+    lookups = out.get("hits", 0) + out.get("misses", 0)
+    out["hit_rate"] = round(out["hits"] / lookups, 4) if lookups else None
+    return out
@@ -0,0 +1,149 @@
+import asyncio
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from . import breaker, metrics
+from .config import cfg
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Only idempotent calls are retried on 429/5xx. ACP job creation and Privy
+# wallet/transaction POSTs must not be replayed; eth_call over JSON-RPC can.
+_RETRY_METHODS = {
+    "acp": frozenset({"GET"}),
+    "privy": frozenset({"GET"}),
+    "rpc": frozenset({"GET", "POST"}),
+}
+
+_sessions = {}
+_lock = threading.Lock()
+_aclients = []
+_anext = 0
+
+
+def _pool_size(service):
+    return {"acp": cfg.acp_pool_size, "privy": cfg.privy_pool_size, "rpc": cfg.rpc_pool_size}[service]
+
+
+def timeout(service):
+    return {"acp": cfg.acp_timeout, "privy": cfg.privy_timeout, "rpc": cfg.rpc_timeout}[service]
+
+
+def _new_session(service):
+    retry = Retry(
+        total=cfg.http_retries,
+        backoff_factor=cfg.http_backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=_RETRY_METHODS[service],
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    size = _pool_size(service)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size, max_retries=retry)
+    s = requests.Session()
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    return s
+
+
+def session(service):
+    """Shared keep-alive session for one upstream ("acp", "privy" or "rpc")."""
+    s = _sessions.get(service)
+    if s is None:
+        with _lock:
+            s = _sessions.get(service)
+            if s is None:
+                s = _sessions[service] = _new_session(service)
+    return s
+
+
+def _observe(service, endpoint, started, failed):
+    metrics.http_request_seconds.observe(time.monotonic() - started, service, endpoint)
+    if failed:
+        metrics.http_request_errors.inc(service, endpoint)
+
+
+def request(service, method, url, endpoint=None, **kwargs):
+    """`endpoint` labels the call in metrics; defaults to the HTTP method.
+
+    Raises breaker.BreakerOpen without sending anything while the service's
+    circuit is open.
+    """
+    kwargs.setdefault("timeout", timeout(service))
+    endpoint = endpoint or method.lower()
+    circuit = breaker.get(service)
+    circuit.check()
+    started = time.monotonic()
+    try:
+        r = session(service).request(method, url, **kwargs)
+    except Exception:
+        circuit.record(False)
+        _observe(service, endpoint, started, True)
+        raise
+    circuit.record(r.status_code not in RETRY_STATUSES)
+    _observe(service, endpoint, started, r.status_code >= 400)
+    return r
+
+
+def async_client():
+    """One of cfg.async_pool_shards shared AsyncClients, round-robin; small pools keep httpcore's scan short."""
+    global _anext
+    if not _aclients:
+        import httpx  # only the async engine needs it; keeps it off the startup path
+
+        shards = max(cfg.async_pool_shards, 1)
+        size = max(cfg.async_max_connections // shards, 1)
+        limits = httpx.Limits(max_connections=size, max_keepalive_connections=size)
+        # Transport-level retries cover connect failures only; status retries live in arequest().
+        _aclients.extend(httpx.AsyncClient(transport=httpx.AsyncHTTPTransport(limits=limits, retries=cfg.http_retries))
+                         for _ in range(shards))
+    _anext = (_anext + 1) % len(_aclients)
+    return _aclients[_anext]
+
+
+async def arequest(service, method, url, endpoint=None, **kwargs):
+    """Async counterpart of request(), with the same retry policy."""
+    kwargs.setdefault("timeout", timeout(service))
+    endpoint = endpoint or method.lower()
+    retryable = method.upper() in _RETRY_METHODS[service]
+    circuit = breaker.get(service)
+    circuit.check()
+    attempt = 0
+    started = time.monotonic()
+    while True:
+        try:
+            r = await async_client().request(method, url, **kwargs)
+        except Exception:
+            circuit.record(False)
+            _observe(service, endpoint, started, True)
+            raise
+        except BaseException:
+            # Cancelled: neither success nor failure, but the probe slot must be freed.
+            circuit.abandon()
+            raise
+        if not retryable or r.status_code not in RETRY_STATUSES or attempt >= cfg.http_retries:
+            circuit.record(r.status_code not in RETRY_STATUSES)
+            _observe(service, endpoint, started, r.status_code >= 400)
+            return r
+        delay = cfg.http_backoff * (2 ** attempt)
+        retry_after = r.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, int(retry_after))
+        attempt += 1
+        try:
+            await asyncio.sleep(delay)
+        except BaseException:
+            circuit.abandon()
+            raise
+
+
+async def aclose():
+    """Close the shared async clients. Must run on the loop that used them."""
+    clients = list(_aclients)
+    _aclients.clear()
+    for client in clients:
+        await client.aclose()
@@ -0,0 +1,189 @@
+import hashlib
+import math
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+from . import logs
+from .config import cfg
+
+log = logs.get_logger("shard")
+
+
+def shard_of(name, count):
+    """Stable shard for an agent name; the same on every process and node (unlike hash())."""
+    digest = hashlib.sha256(name.encode()).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+
+def mine(agents, index=None, count=None):
+    """The agents this process drives: those hashing to shard `index` of `count`."""
+    index = cfg.shard_index if index is None else index
+    count = cfg.shard_count if count is None else count
+    if count <= 1:
+        return list(agents)
+    return [a for a in agents if shard_of(a["name"], count) == index]
+
+
+class WorkerPool:
+    """Runs the volume engine in cfg.volume_workers child processes (app.worker).
+
+    Worker i takes global shard shard_index * W + i of shard_count * W and
+    listens on cfg.volume_worker_port + i.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._procs = {}
+        self._session = requests.Session()
+
+    def _url(self, i, path):
+        return f"http://127.0.0.1:{cfg.volume_worker_port + i}{path}"
+
+    def _spawn(self, i):
+        w = cfg.volume_workers
+        env = dict(os.environ,
+                   SHARD_INDEX=str(cfg.shard_index * w + i),
+                   SHARD_COUNT=str(cfg.shard_count * w),
+                   VOLUME_WORKERS="0",
+                   FUND_REMOTE="1",
+                   WORKER_INDEX=str(i),
+                   RESULT_STORE_MAX_BYTES=str(cfg.result_store_max_bytes // w),
+                   VOLUME_ENGINE=cfg.engine,
+                   TARGET_JOBS_PER_MINUTE=str(cfg.target_jobs_per_minute / w),
+                   MAX_IN_FLIGHT=str(math.ceil(cfg.max_in_flight / w)),
+                   AGENT_JOBS_PER_MINUTE=str(cfg.agent_jobs_per_minute))
+        cmd = [sys.executable, "-m", "app.worker", "--port", str(cfg.volume_worker_port + i)]
+        return subprocess.Popen(cmd, env=env)
+
+    def ensure(self):
+        """Start any worker process that isn't running and wait until it answers."""
+        with self._lock:
+            for i in range(cfg.volume_workers):
+                proc = self._procs.get(i)
+                if proc is None or proc.poll() is not None:
+                    log.info(f"[shard] Starting volume worker {i} on port {cfg.volume_worker_port + i}")
+                    self._procs[i] = self._spawn(i)
+            procs = dict(self._procs)
+        deadline = time.monotonic() + cfg.volume_worker_start_timeout
+        for i in procs:
+            while True:
+                try:
+                    self._session.get(self._url(i, "/health"), timeout=1).raise_for_status()
+                    break
+                except requests.RequestException:
+                    if time.monotonic() > deadline:
+                        raise RuntimeError(f"volume worker {i} did not come up")
+                    time.sleep(0.2)
+
+    def _each(self, method, path, **kwargs):
+        """Call every worker; returns [(index, json or None, error or None)]."""
+        out = []
+        for i in sorted(self._procs):
+            try:
+                r = self._session.request(method, self._url(i, path), timeout=cfg.volume_worker_timeout, **kwargs)
+                out.append((i, r.json() if "json" in r.headers.get("content-type", "") else r.text, None))
+            except (requests.RequestException, ValueError) as e:
+                out.append((i, None, str(e)))
+        return out
+
+    def start(self):
+        try:
+            self.ensure()
+        except RuntimeError as e:
+            return False, str(e)
+        replies = self._each("POST", "/volume/start")
+        failed = [f"worker {i}: {err or body.get('message')}" for i, body, err in replies
+                  if err or not body.get("ok")]
+        if failed and len(failed) == len(replies):
+            return False, "; ".join(failed)
+        msg = f"started {len(replies) - len(failed)}/{len(replies)} volume workers"
+        return True, msg + (f" ({'; '.join(failed)})" if failed else "")
+
+    def stop(self):
+        self._each("POST", "/volume/stop")
+
+    def configure(self, limits):
+        """Forward /volume/rate, splitting global limits across workers."""
+        w = max(len(self._procs), 1)
+        scaled = dict(limits)
+        if "jobs_per_minute" in scaled:
+            scaled["jobs_per_minute"] = float(scaled["jobs_per_minute"]) / w
+        if "max_in_flight" in scaled:
+            scaled["max_in_flight"] = math.ceil(int(scaled["max_in_flight"]) / w)
+        return {i: body if err is None else {"error": err} for i, body, err in self._each("POST", "/volume/rate", json=scaled)}
+
+    def running(self):
+        return any(body and body.get("running") for _, body, _ in self._each("GET", "/volume/status"))
+
+    def status(self):
+        workers, stats, running = [], {}, False
+        for i, body, err in self._each("GET", "/volume/status"):
+            if err:
+                workers.append({"worker": i, "error": err})
+                continue
+            running = running or body.get("running", False)
+            for k, v in (body.get("stats") or {}).items():
+                stats[k] = stats.get(k, 0) + v
+            workers.append({"worker": i, **body})
+        return {"running": running, "engine": cfg.engine, "stats": stats, "workers": workers}
+
+    def demand(self):
+        """Spend and top-up requests every worker queued since the last call, as [reply]."""
+        return [body for _, body, err in self._each("POST", "/fund/demand") if err is None and isinstance(body, dict)]
+
+    def credit(self, amounts):
+        """Tell every worker about {address: usdc} just sent, so their cached balances see it."""
+        if amounts:
+            self._each("POST", "/fund/credit", json=amounts)
+
+    def metrics(self, local=""):
+        """`local` plus every worker's /metrics as one exposition; worker samples get a worker label."""
+        families, order = {}, []
+        sources = [(None, local, None)] + self._each("GET", "/metrics")
+        for i, body, err in sources:
+            if err or not isinstance(body, str):
+                continue
+            current = None
+            for line in body.splitlines():
+                if not line:
+                    continue
+                if line.startswith("#"):
+                    name = current = line.split()[2]
+                    if name not in families:
+                        families[name] = {"head": [], "samples": []}
+                        order.append(name)
+                    if len(families[name]["head"]) < 2:
+                        families[name]["head"].append(line)
+                    continue
+                series, value = line.rsplit(" ", 1)
+                if i is None:
+                    pass
+                elif "{" in series:
+                    series = series.replace("{", f'{{worker="{i}",', 1)
+                else:
+                    series = f'{series}{{worker="{i}"}}'
+                families[current]["samples"].append(f"{series} {value}")
+        lines = []
+        for name in order:
+            lines.extend(families[name]["head"])
+            lines.extend(families[name]["samples"])
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def close(self):
+        with self._lock:
+            procs, self._procs = list(self._procs.values()), {}
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+workers = WorkerPool()
@@ -0,0 +1,203 @@
+import threading
+import time
+
+from . import logs
+from .config import cfg
+
+log = logs.get_logger("tasks")
+
+IDLE, RUNNING, RETRYING, SUCCEEDED, FAILED, CANCELLED = (
+    "idle", "running", "retrying", "succeeded", "failed", "cancelled")
+
+
+class _Task:
+    def __init__(self, name, fn, retries):
+        self.name = name
+        self.fn = fn
+        self.retries = retries
+        self.state = IDLE
+        self.attempts = 0
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.cancel = threading.Event()
+        self.done = threading.Event()
+        self.done.set()
+        self.thread = None
+
+    def snapshot(self):
+        return {
+            "name": self.name,
+            "state": self.state,
+            "attempts": self.attempts,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "result": self.result,
+        }
+
+
+class TaskSupervisor:
+    """Runs named long jobs (setup, fund, volume start) on background threads.
+
+    A task takes a cancel Event and returns a result dict. Failures
+    ({"ok": False} or an exception) are retried with doubling backoff;
+    cancel() sets the event and stops retries.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tasks = {}
+
+    def register(self, name, fn, retries=None):
+        with self._lock:
+            self._tasks[name] = _Task(name, fn, cfg.task_retries if retries is None else retries)
+
+    def _get(self, name):
+        task = self._tasks.get(name)
+        if task is None:
+            raise KeyError(name)
+        return task
+
+    def submit(self, name):
+        """Start `name` in the background. Returns (started, snapshot); False if it is already running."""
+        with self._lock:
+            task = self._get(name)
+            if not task.done.is_set():
+                return False, task.snapshot()
+            task.cancel = threading.Event()
+            task.done = threading.Event()
+            task.state, task.attempts, task.error, task.result = RUNNING, 0, None, None
+            task.started_at, task.finished_at = time.time(), None
+            task.thread = threading.Thread(target=self._run, args=(task,), name=f"task-{name}", daemon=True)
+            task.thread.start()
+            return True, task.snapshot()
+
+    def wait(self, name, timeout=None):
+        """Block until the current run of `name` ends; returns its snapshot."""
+        with self._lock:
+            done = self._get(name).done
+        done.wait(timeout)
+        return self.status(name)
+
+    def cancel(self, name):
+        """Ask a running task to stop. Returns its snapshot, or None if it wasn't running."""
+        with self._lock:
+            task = self._get(name)
+            if task.done.is_set():
+                return None
+            task.cancel.set()
+            return task.snapshot()
+
+    def cancel_all(self):
+        with self._lock:
+            for task in self._tasks.values():
+                task.cancel.set()
+
+    def _run(self, task):
+        cancel = task.cancel
+        delay = cfg.task_retry_backoff
+        while True:
+            with self._lock:
+                task.attempts += 1
+                task.state = RUNNING
+            try:
+                result = task.fn(cancel)
+                failed = isinstance(result, dict) and result.get("ok") is False
+                error = (result.get("error") or result.get("message") or "failed") if failed else None
+            except Exception as e:
+                result, error = None, str(e)
+                log.error(f"[tasks] {task.name} raised: {e}")
+            with self._lock:
+                task.result, task.error = result, error
+                if cancel.is_set():
+                    task.state = CANCELLED
+                elif error is None:
+                    task.state = SUCCEEDED
+                elif task.attempts > task.retries:
+                    task.state = FAILED
+                else:
+                    task.state = RETRYING
+                if task.state != RETRYING:
+                    task.finished_at = time.time()
+                    task.done.set()
+                    break
+            log.warning(f"[tasks] {task.name} failed ({error}), retrying in {delay:.0f}s "
+                        f"(attempt {task.attempts}/{task.retries + 1})")
+            if cancel.wait(delay):
+                with self._lock:
+                    task.state = CANCELLED
+                    task.finished_at = time.time()
+                    task.done.set()
+                break
+            delay *= 2
+        log.info(f"[tasks] {task.name} {task.state} after {task.attempts} attempt(s)")
+
+    def status(self, name=None):
+        with self._lock:
+            if name is not None:
+                return self._get(name).snapshot()
+            return {n: t.snapshot() for n, t in self._tasks.items()}
+
+    def states(self):
+        with self._lock:
+            return {n: t.state for n, t in self._tasks.items()}
+
+
+class Snapshots:
+    """Values that are slow to compute, refreshed on one background thread.
+
+    Endpoints read the last value in O(1) instead of hitting disk or the
+    network per request, so probes stay fast under load.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sources = {}
+        self._values = {}
+        self._stamp = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def register(self, name, fn):
+        with self._lock:
+            self._sources[name] = fn
+
+    def refresh(self):
+        with self._lock:
+            sources = dict(self._sources)
+        for name, fn in sources.items():
+            try:
+                value = fn()
+            except Exception as e:
+                value = {"error": str(e)}
+            with self._lock:
+                self._values[name] = value
+        self._stamp = time.time()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self.refresh()
+        self._thread = threading.Thread(target=self._run, name="snapshots", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(cfg.snapshot_interval):
+            self.refresh()
+
+    def stop(self):
+        self._stop.set()
+
+    def get(self, name, default=None):
+        with self._lock:
+            return self._values.get(name, default)
+
+    def age(self):
+        return None if self._stamp is None else round(time.time() - self._stamp, 3)
+
+
+supervisor = TaskSupervisor()
+snapshots = Snapshots()
@@ -1,10 +1,18 @@
+import asyncio
 import random
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
-from .acp import create_job, job_status
+from . import acp, breaker, fund, logs, metrics, sessions, shard
+from .acp import create_job
 from .config import cfg
-from .privy import get_usdc_balance
+from .events import job_events
+from .governor import governor
+from .journal import journal, siblings as journal_siblings
+from .results import results
+from .poller import Poller
+from .balances import BalanceUnavailable, balance_cache
 from .questions import get_random_question
 from .wallets import get_agents_with_keys
 
@@ -12,151 +20,441 @@ _stop_event = threading.Event()
 _threads = []
 _lock = threading.Lock()
 
-_stats = {"completed": 0, "failed": 0, "timeout": 0, "errors": 0}
+_loop = None
+_tasks = []
+_draining = threading.Event()
 
+# agent name -> USDC reserved by that agent's jobs in flight.
+_reserved = {}
 
-def _log(msg):
-    print(msg, flush=True)
+# Outcome totals live in metrics.jobs_finished; stats() reports them relative to the last start().
+_OUTCOMES = ("completed", "failed", "timeout", "errors")
+_baseline = {}
+
+# job_id -> question for jobs in flight, so a deliverable can be filed under its question.
+_questions = {}
+
+TERMINAL_FAILURES = ("REJECTED", "CANCELLED", "EXPIRED")
+
+# Result writes are SQLite transactions; _check_job can run on the asyncio loop, so they go here instead.
+_result_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="result-writer")
+
+
+log = logs.get_logger("volume")
+
+
+def _count(agent, key):
+    metrics.jobs_finished.inc(agent["name"], key)
+
+
+def _outcome_totals():
+    totals = dict.fromkeys(_OUTCOMES, 0)
+    for (_, outcome), n in metrics.jobs_finished.values().items():
+        totals[outcome] = totals.get(outcome, 0) + n
+    return totals
+
+
+def _observe_outcome(agent, job_id, outcome, created_at):
+    _questions.pop(str(job_id), None)
+    journal().finished(job_id, outcome)
+    if outcome == "completed":
+        metrics.job_completion_seconds.observe(time.monotonic() - created_at)
+    _count(agent, outcome)
+
+
+def _check_job(agent, job_id, data, last_phase):
+    """Inspect one status payload. Returns (phase, outcome); outcome is one of _OUTCOMES once the job is done."""
+    name = agent["name"]
+    if not isinstance(data, dict):
+        raise ValueError(f"expected an object, got {type(data).__name__}")
+    # Check for hard errors (e.g. insufficient balance)
+    job_errors = data.get("errors") or []
+    if job_errors:
+        first = job_errors[0] if isinstance(job_errors, list) else job_errors
+        log.warning(f"[{name}] Job {job_id} error: {first}", agent=name, job_id=job_id)
+        return last_phase, "failed"
+
+    job_data = data.get("data") or {}
+    if not isinstance(job_data, dict):
+        raise ValueError(f"expected data to be an object, got {type(job_data).__name__}")
+    phase = job_data.get("phase")
+
+    if phase and phase != last_phase:
+        journal().phase(job_id, phase)
+        log.info(f"[{name}] Job {job_id} phase: {phase}", agent=name, job_id=job_id, phase=phase, sample=True)
+
+    if phase == "COMPLETED":
+        deliverable = job_data.get("deliverable") or {}
+        if not isinstance(deliverable, dict):
+            deliverable = {"value": deliverable}
+        response = deliverable.get("value", "no response")
+        log.info(f"[{name}] Job {job_id} COMPLETED", agent=name, job_id=job_id, response_chars=len(str(response)))
+        logs.deliverable(name, job_id, response)
+        question = _questions.get(str(job_id))
+        if question and deliverable.get("value") is not None:
+            _result_writer.submit(_store_result, name, job_id, question, response)
+        _charge(agent, job_data)
+        return phase, "completed"
+
+    if phase in TERMINAL_FAILURES:
+        log.warning(f"[{name}] Job {job_id} FAILED: {phase}", agent=name, job_id=job_id, phase=phase)
+        return phase, "failed"
+
+    return phase or last_phase, None
+
+
+def _store_result(name, job_id, question, response):
+    try:
+        results().put(question, response, job_id=job_id, agent=name)
+    except Exception as e:
+        log.warning(f"[{name}] Could not store deliverable for job {job_id}: {e}", agent=name, job_id=job_id)
+
+
+def _charge(agent, job_data):
+    """Debit the cached balance for a paid job and feed the fund scheduler's burn rate."""
+    price = job_data.get("price")
+    if not isinstance(price, (int, float)):
+        price = cfg.job_price_usdc
+    if agent.get("acp_wallet"):
+        balance_cache.adjust(agent["acp_wallet"], -price)
+    fund.scheduler.record_spend(agent["name"], price)
+
+
+def _create_failed(agent, err):
+    name = agent["name"]
+    if breaker.get("acp").state != breaker.CLOSED:
+        # Turned away locally while ACP is down; not a job error.
+        log.debug(f"[{name}] Job creation skipped: {err}", agent=name)
+        return
+    log.warning(f"[{name}] Job creation failed: {err}", agent=name)
+    _count(agent, "errors")
+
+
+def _acp_backoff():
+    """Seconds to hold off creating jobs because the ACP circuit is open; 0 when it's fine to try."""
+    return breaker.get("acp").retry_in()
 
 
 def _run_single_job(agent):
     name = agent["name"]
-    question = get_random_question()
-    _log(f"[{name}] Creating job: {question[:60]}...")
+    question = get_random_question(name)
+    log.debug(f"[{name}] Creating job: {question[:60]}...", agent=name)
 
+    started = time.monotonic()
     job_id, err = create_job(agent, question)
+    metrics.create_job_seconds.observe(time.monotonic() - started)
     if err:
-        _log(f"[{name}] Job creation failed: {err}")
-        with _lock:
-            _stats["errors"] += 1
+        _create_failed(agent, err)
         return
 
-    _log(f"[{name}] Job {job_id} created, polling...")
-    deadline = time.time() + cfg.job_timeout_sec
-    last_phase = None
-    poll_errors = 0
-
-    while not _stop_event.is_set() and time.time() < deadline:
-        data, err = job_status(agent, job_id)
-
-        if err:
-            poll_errors += 1
-            _log(f"[{name}] Job {job_id} poll error ({poll_errors}): {err}")
-            if poll_errors >= 5:
-                _log(f"[{name}] Job {job_id} too many poll errors, giving up")
-                with _lock:
-                    _stats["errors"] += 1
-                return
-            time.sleep(cfg.poll_interval)
-            continue
+    metrics.jobs_created.inc(name)
+    journal().created(job_id, name, question)
+    _questions[str(job_id)] = question
+    created_at = time.monotonic()
+    log.info(f"[{name}] Job {job_id} created, polling...", agent=name, job_id=job_id, sample=True)
+    outcome = _poller.track(agent, job_id).result()
+    if outcome:
+        _observe_outcome(agent, job_id, outcome, created_at)
+    else:
+        # Poller stopped with the job open; it stays in the journal for resume_jobs().
+        _questions.pop(str(job_id), None)
 
-        poll_errors = 0
-
-        # Check for hard errors (e.g. insufficient balance)
-        job_errors = data.get("errors") or []
-        if job_errors:
-            _log(f"[{name}] Job {job_id} error: {job_errors[0]}")
-            with _lock:
-                _stats["failed"] += 1
-            return
-
-        job_data = data.get("data", {})
-        phase = job_data.get("phase")
-
-        if phase and phase != last_phase:
-            _log(f"[{name}] Job {job_id} phase: {phase}")
-            last_phase = phase
-
-        if phase == "COMPLETED":
-            deliverable = job_data.get("deliverable") or {}
-            response = deliverable.get("value", "no response")
-            _log(f"[{name}] Job {job_id} COMPLETED")
-            _log(f"[{name}] BRAIN RESPONSE:\n{'-'*60}\n{response}\n{'-'*60}\n")
-            with _lock:
-                _stats["completed"] += 1
-            return
-
-        if phase in ("REJECTED", "CANCELLED", "EXPIRED"):
-            _log(f"[{name}] Job {job_id} FAILED: {phase}")
-            with _lock:
-                _stats["failed"] += 1
-            return
-
-        time.sleep(cfg.poll_interval)
-
-    _log(f"[{name}] Job {job_id} TIMEOUT (last phase: {last_phase})")
-    with _lock:
-        _stats["timeout"] += 1
 
+_poller = Poller(_check_job)
 
-def _ensure_funded(agent):
-    """Returns True if agent has enough balance to run a job, False otherwise."""
-    from .fund import do_fund
+
+def _ensure_funded(agent, balance=None):
+    """Reserve one job's price from the agent's balance; False if it can't afford another job now.
+
+    The reservation is held until _release_funds(). A short agent asks the
+    fund scheduler for a top-up instead of waiting on a transfer.
+    """
     name = agent["name"]
     acp_wallet = agent.get("acp_wallet")
     if not acp_wallet:
         return False
-    balance = get_usdc_balance(acp_wallet)
-    if balance >= 0.5:
-        return True
-    _log(f"[{name}] Low balance ({balance:.4f} USDC), triggering refund...")
-    result = do_fund()
-    if result.get("error"):
-        _log(f"[{name}] Refund failed: {result['error']} — waiting for master wallet top-up")
-        return False
-    master_bal = result.get("master_balance_before", 0)
-    funded = result.get("successful", 0)
-    _log(f"[{name}] Refund: {funded} agents funded (master had {master_bal:.4f} USDC)")
-    # Re-check balance after refund
-    balance = get_usdc_balance(acp_wallet)
-    if balance < 0.5:
-        _log(f"[{name}] Still insufficient after refund ({balance:.4f} USDC) — skipping job")
-        return False
-    return True
+    if balance is None:
+        try:
+            balance = balance_cache.get(acp_wallet)
+        except BalanceUnavailable as e:
+            # Unknown is not empty: back off without asking for a top-up.
+            log.warning(f"[{name}] Balance unavailable ({e}), pausing", agent=name, sample=True)
+            return False
+    with _lock:
+        reserved = _reserved.get(name, 0.0)
+        if balance - reserved >= max(cfg.fund_min_balance, cfg.job_price_usdc):
+            _reserved[name] = reserved + cfg.job_price_usdc
+            return True
+    log.info(f"[{name}] Low balance ({balance:.4f} USDC, {reserved:.4f} reserved), requesting top-up",
+             agent=name, balance=balance, reserved=reserved)
+    fund.scheduler.request(agent)
+    return False
 
 
-def _agent_loop(agent):
+def _release_funds(agent):
+    with _lock:
+        left = _reserved.get(agent["name"], 0.0) - cfg.job_price_usdc
+        if left > 1e-9:
+            _reserved[agent["name"]] = left
+        else:
+            _reserved.pop(agent["name"], None)
+
+
+def _agent_loop(agent, lane=0):
     name = agent["name"]
-    _log(f"[{name}] Agent thread started")
+    log.info(f"[{name}] Agent thread {lane} started")
     while not _stop_event.is_set():
-        if _ensure_funded(agent):
-            _run_single_job(agent)
-        else:
-            _log(f"[{name}] No funds, sleeping 60s before retry...")
-            for _ in range(60):
-                if _stop_event.is_set():
-                    break
-                time.sleep(1)
+        wait = _acp_backoff()
+        if wait:
+            _stop_event.wait(wait)
+            continue
+        if not _ensure_funded(agent):
+            _stop_event.wait(cfg.fund_retry_sec)
             continue
-        sleep_sec = random.randint(cfg.min_sleep, cfg.max_sleep)
-        for _ in range(sleep_sec):
-            if _stop_event.is_set():
-                break
-            time.sleep(1)
-    _log(f"[{name}] Agent thread stopped")
+        try:
+            if governor.enabled():
+                # Target-rate mode: the governor paces starts, no per-agent sleep.
+                if not governor.acquire(agent, _stop_event):
+                    # Stopped, or the target rate was switched off: back to sleep pacing.
+                    continue
+                try:
+                    _run_single_job(agent)
+                finally:
+                    governor.release()
+                continue
+            _run_single_job(agent)
+        finally:
+            _release_funds(agent)
+        _stop_event.wait(random.randint(cfg.min_sleep, cfg.max_sleep))
+    log.info(f"[{name}] Agent thread {lane} stopped")
+
+
+# -- asyncio engine: one event loop drives every agent as a coroutine --
+
+async def _run_single_job_async(agent):
+    name = agent["name"]
+    question = get_random_question(name)
+    log.debug(f"[{name}] Creating job: {question[:60]}...", agent=name)
+
+    started = time.monotonic()
+    job_id, err = await acp.create_job_async(agent, question)
+    metrics.create_job_seconds.observe(time.monotonic() - started)
+    if err:
+        _create_failed(agent, err)
+        return
+
+    metrics.jobs_created.inc(name)
+    journal().created(job_id, name, question)
+    _questions[str(job_id)] = question
+    created_at = time.monotonic()
+    log.info(f"[{name}] Job {job_id} created, polling...", agent=name, job_id=job_id, sample=True)
+    outcome = await asyncio.wrap_future(_poller.track(agent, job_id))
+    if outcome:
+        _observe_outcome(agent, job_id, outcome, created_at)
+    else:
+        _questions.pop(str(job_id), None)
+
+
+async def _pause(seconds):
+    """asyncio.sleep that ends early once stop() is called."""
+    deadline = time.monotonic() + seconds
+    while not _stop_event.is_set() and time.monotonic() < deadline:
+        await asyncio.sleep(min(1.0, deadline - time.monotonic()))
+
+
+async def _agent_loop_async(agent, lane=0):
+    name = agent["name"]
+    log.info(f"[{name}] Agent task {lane} started")
+    try:
+        while not _stop_event.is_set():
+            wait = _acp_backoff()
+            if wait:
+                await _pause(wait)
+                continue
+            # Cache hits are settled here; only a miss (a blocking RPC lookup) goes to a thread.
+            balance = balance_cache.peek(agent["acp_wallet"]) if agent.get("acp_wallet") else None
+            if balance is not None:
+                funded = _ensure_funded(agent, balance)
+            else:
+                funded = await asyncio.to_thread(_ensure_funded, agent)
+            if not funded:
+                await _pause(cfg.fund_retry_sec)
+                continue
+            try:
+                if governor.enabled():
+                    if not await governor.acquire_async(agent, _stop_event):
+                        continue
+                    try:
+                        await _run_single_job_async(agent)
+                    finally:
+                        governor.release()
+                    continue
+                await _run_single_job_async(agent)
+            finally:
+                _release_funds(agent)
+            await _pause(random.randint(cfg.min_sleep, cfg.max_sleep))
+    except asyncio.CancelledError:
+        pass
+    log.info(f"[{name}] Agent task {lane} stopped")
+
+
+async def _engine_main(agents):
+    global _tasks
+    poller = asyncio.create_task(_poller.run_async())
+    _tasks = [asyncio.create_task(_agent_loop_async(a, lane))
+              for a in agents for lane in range(max(cfg.agent_max_in_flight, 1))]
+    try:
+        await asyncio.gather(*_tasks, return_exceptions=True)
+        # Lanes are done; give resumed jobs the rest of the drain window.
+        while _poller.tracked() and _draining.is_set():
+            await asyncio.sleep(0.2)
+    finally:
+        _tasks = []
+        _poller.stop()
+        await poller
+        await sessions.aclose()
+
+
+def _engine_thread(agents):
+    global _loop
+    loop = asyncio.new_event_loop()
+    _loop = loop
+    try:
+        loop.run_until_complete(_engine_main(agents))
+    finally:
+        _loop = None
+        loop.close()
+
+
+def _cancel_tasks():
+    for t in _tasks:
+        t.cancel()
 
 
 def start():
     global _threads
+    if _draining.is_set():
+        return False, "still draining jobs from the last stop; try again shortly"
     if _threads and any(t.is_alive() for t in _threads):
         return True, "already running"
-    agents = get_agents_with_keys()[:cfg.num_agents]
+    agents = shard.mine(get_agents_with_keys()[:cfg.num_agents])
     if not agents:
+        if cfg.shard_count > 1:
+            return False, f"no agents hash to shard {cfg.shard_index} of {cfg.shard_count}"
         return False, "no agents with API keys; run POST /setup first"
+    if cfg.engine not in ("threads", "async"):
+        return False, f"unknown engine {cfg.engine!r}; use 'threads' or 'async'"
     _stop_event.clear()
     with _lock:
-        _stats.update({"completed": 0, "failed": 0, "timeout": 0, "errors": 0})
+        _baseline.clear()
+        _baseline.update(_outcome_totals())
+        _reserved.clear()
     _threads = []
-    for agent in agents:
-        t = threading.Thread(target=_agent_loop, args=(agent,), daemon=True)
+    lanes = max(cfg.agent_max_in_flight, 1)
+    if cfg.engine == "async":
+        t = threading.Thread(target=_engine_thread, args=(agents,), daemon=True)
         t.start()
         _threads.append(t)
-    return True, f"started {len(_threads)} agent threads"
+        return True, f"started {len(agents)} agents x {lanes} lanes on async engine"
+    _poller.start()
+    for agent in agents:
+        for lane in range(lanes):
+            t = threading.Thread(target=_agent_loop, args=(agent, lane), daemon=True)
+            t.start()
+            _threads.append(t)
+    return True, f"started {len(agents)} agents x {lanes} lanes ({len(_threads)} threads)"
+
+
+def _lanes_busy():
+    if cfg.engine == "async":
+        return any(not t.done() for t in list(_tasks))
+    return any(t.is_alive() for t in _threads)
+
+
+def _drain():
+    """Let jobs already created run to an outcome, then stop polling (at most cfg.drain_timeout)."""
+    deadline = time.monotonic() + cfg.drain_timeout
+    while (_lanes_busy() or _poller.tracked()) and time.monotonic() < deadline:
+        time.sleep(0.2)
+    left = _poller.tracked()
+    if left:
+        log.warning(f"[volume] {left} jobs still open after {cfg.drain_timeout:.0f}s drain; "
+                    f"the journal resumes them on next start")
+    else:
+        log.info("[volume] Drained all in-flight jobs")
+    _poller.stop()
+    job_events.close()
+    loop = _loop
+    if loop is not None:
+        try:
+            loop.call_soon_threadsafe(_cancel_tasks)
+        except RuntimeError:
+            pass
+    _draining.clear()
 
 
 def stop():
+    """Stop creating jobs; jobs in flight keep being polled until they finish (see _drain)."""
+    if _stop_event.is_set():
+        return True, "stop already requested"
     _stop_event.set()
-    return True, "stop requested"
+    _draining.set()
+    threading.Thread(target=_drain, name="volume-drain", daemon=True).start()
+    return True, f"stop requested; draining {_poller.tracked()} jobs in flight"
+
+
+def resume_jobs():
+    """Track jobs the journal still has open after a restart; call after start(). Returns how many."""
+    known = {a["name"] for a in get_agents_with_keys()}
+    agents = {a["name"]: a for a in shard.mine(get_agents_with_keys())}
+    for source in journal_siblings():
+        try:
+            journal().adopt(set(agents), source)
+        except Exception as e:
+            log.warning(f"[volume] Could not take over open jobs from {source.path}: {e}")
+    resumed = 0
+    for row in journal().unfinished():
+        job_id = row["job_id"]
+        agent = agents.get(row["agent"])
+        if agent is None:
+            if row["agent"] not in known:
+                journal().finished(job_id, "orphaned")
+            # Otherwise another shard owns it.
+            continue
+        if _poller.tracking(job_id):
+            continue
+        if row["question"]:
+            _questions[str(job_id)] = row["question"]
+        created_at = time.monotonic() - max(time.time() - row["created_at"], 0)
+
+        def done(future, agent=agent, job_id=job_id, created_at=created_at):
+            outcome = future.result()
+            if outcome:
+                _observe_outcome(agent, job_id, outcome, created_at)
+            else:
+                _questions.pop(str(job_id), None)
+
+        _poller.track(agent, job_id, created_at=row["created_at"]).add_done_callback(done)
+        resumed += 1
+    if resumed:
+        log.info(f"[volume] Resumed tracking {resumed} unfinished jobs from the journal")
+    return resumed
+
+
+def status():
+    return {
+        "running": running(),
+        "draining": _draining.is_set(),
+        "engine": cfg.engine,
+        "agent_max_in_flight": cfg.agent_max_in_flight,
+        "shard": {"index": cfg.shard_index, "count": cfg.shard_count},
+        "stats": stats(),
+        "balance_cache": balance_cache.stats(),
+        "events": job_events.stats(),
+        "poller": poller_stats(),
+        "governor": governor.stats(),
+        "breakers": breaker.snapshot(),
+    }
 
 
 def running():
@@ -164,5 +462,15 @@ def running():
 
 
 def stats():
+    totals = _outcome_totals()
     with _lock:
-        return dict(_stats)
+        return {k: totals.get(k, 0) - _baseline.get(k, 0) for k in _OUTCOMES}
+
+
+def poller_stats():
+    return _poller.stats()
+
+
+metrics.Gauge("acp_bot_jobs_in_flight", "Jobs created and not yet resolved.", lambda: _poller.tracked())
+metrics.Gauge("acp_bot_agents_running", "Agent loops currently running.",
+              lambda: sum(t.is_alive() for t in _threads) if cfg.engine == "threads" else len(_tasks))
@@ -1,19 +1,233 @@
 import json
 import os
+import sqlite3
+import threading
 
+from . import logs
 from .config import cfg
 
 
+log = logs.get_logger("wallets")
+
+
+class JsonWalletStore:
+    """wallets.json with an mtime-keyed parse cache and atomic rewrites.
+
+    Every upsert rewrites the whole file, so this suits hand-edited or
+    small wallet lists (WALLET_STORE=json); the default is SqliteWalletStore.
+    Reads return copies, so callers can't change the cache.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._stamp = None
+        self._wallets = []
+        self._by_name = {}
+        self._by_address = {}
+
+    def _index(self, wallets):
+        self._wallets = wallets
+        self._by_name = {w.get("name"): w for w in wallets}
+        self._by_address = {}
+        for w in wallets:
+            for key in ("acp_wallet", "privy_address"):
+                if w.get(key):
+                    self._by_address[w[key].lower()] = w
+
+    def _refresh(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self._stamp = None
+            self._index([])
+            return
+        stamp = (st.st_mtime_ns, st.st_size)
+        if stamp != self._stamp:
+            with open(self.path) as f:
+                self._index(json.load(f))
+            self._stamp = stamp
+
+    def load(self):
+        with self._lock:
+            self._refresh()
+            return [dict(w) for w in self._wallets]
+
+    def save(self, wallets):
+        with self._lock:
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(wallets, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            self._index([dict(w) for w in wallets])
+            st = os.stat(self.path)
+            self._stamp = (st.st_mtime_ns, st.st_size)
+
+    def upsert(self, record):
+        with self._lock:
+            wallets = self.load()
+            for i, w in enumerate(wallets):
+                if w.get("name") == record["name"]:
+                    wallets[i] = {**w, **record}
+                    break
+            else:
+                wallets.append(dict(record))
+            self.save(wallets)
+
+    def get(self, name):
+        with self._lock:
+            self._refresh()
+            w = self._by_name.get(name)
+            return dict(w) if w else None
+
+    def get_by_address(self, address):
+        with self._lock:
+            self._refresh()
+            w = self._by_address.get(address.lower())
+            return dict(w) if w else None
+
+
+class SqliteWalletStore:
+    """One row per wallet keyed by name; single-record upserts, WAL journal.
+
+    Reads come from an in-memory copy rebuilt when PRAGMA data_version
+    changes. An empty database imports wallets.json once.
+    """
+
+    def __init__(self, path, import_from=None):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS wallets ("
+            " name TEXT PRIMARY KEY,"
+            " privy_address TEXT,"
+            " acp_wallet TEXT,"
+            " data TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS wallets_acp ON wallets(acp_wallet)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS wallets_privy ON wallets(privy_address)")
+        self._version = None
+        self._wallets = []
+        self._by_name = {}
+        if import_from and os.path.exists(import_from) and self._count() == 0:
+            n = self.import_json(import_from)
+            log.info(f"[wallets] Imported {n} wallets from {import_from} into {path}")
+
+    def _count(self):
+        return self._conn.execute("SELECT COUNT(*) FROM wallets").fetchone()[0]
+
+    def import_json(self, path):
+        with open(path) as f:
+            wallets = json.load(f)
+        self.save(wallets)
+        return len(wallets)
+
+    def _refresh(self):
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._version:
+            return
+        rows = self._conn.execute("SELECT data FROM wallets ORDER BY rowid").fetchall()
+        self._wallets = [json.loads(r[0]) for r in rows]
+        self._by_name = {w.get("name"): w for w in self._wallets}
+        self._version = version
+
+    def load(self):
+        with self._lock:
+            self._refresh()
+            return [dict(w) for w in self._wallets]
+
+    def _write(self, record):
+        privy, acp = ((record.get(k) or "").lower() or None for k in ("privy_address", "acp_wallet"))
+        self._conn.execute(
+            "INSERT INTO wallets (name, privy_address, acp_wallet, data) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT(name) DO UPDATE SET privy_address=excluded.privy_address,"
+            " acp_wallet=excluded.acp_wallet, data=excluded.data",
+            (record["name"], privy, acp, json.dumps(record)),
+        )
+
+    def save(self, wallets):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM wallets")
+                for w in wallets:
+                    self._write(w)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._version = None
+
+    def upsert(self, record):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT data FROM wallets WHERE name = ?", (record["name"],)).fetchone()
+                merged = {**json.loads(row[0]), **record} if row else dict(record)
+                self._write(merged)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            # data_version only tracks other connections, so drop our cache explicitly.
+            self._version = None
+
+    def get(self, name):
+        with self._lock:
+            self._refresh()
+            w = self._by_name.get(name)
+            return dict(w) if w else None
+
+    def get_by_address(self, address):
+        address = address.lower()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM wallets WHERE acp_wallet = ? OR privy_address = ? LIMIT 1", (address, address)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def store():
+    global _store
+    key = (cfg.wallet_store, cfg.wallets_file, cfg.wallets_db)
+    with _store_lock:
+        if _store is None or _store[0] != key:
+            if cfg.wallet_store == "sqlite":
+                backend = SqliteWalletStore(cfg.wallets_db, import_from=cfg.wallets_file)
+            else:
+                backend = JsonWalletStore(cfg.wallets_file)
+            _store = (key, backend)
+        return _store[1]
+
+
 def load_wallets():
-    if not os.path.exists(cfg.wallets_file):
-        return []
-    with open(cfg.wallets_file) as f:
-        return json.load(f)
+    return store().load()
 
 
 def save_wallets(wallets):
-    with open(cfg.wallets_file, "w") as f:
-        json.dump(wallets, f, indent=2)
+    store().save(wallets)
+
+
+def upsert_wallet(record):
+    """Insert or merge one wallet record, matched by name."""
+    store().upsert(record)
+
+
+def get_wallet(name):
+    return store().get(name)
+
+
+def get_wallet_by_address(address):
+    return store().get_by_address(address)
 
 
 def get_agents_with_keys():
@@ -0,0 +1,83 @@
+"""Volume worker process: runs the engine for one shard of agents.
+
+Started by shard.WorkerPool with SHARD_INDEX/SHARD_COUNT set; the main app
+controls it over a small HTTP API on 127.0.0.1.
+"""
+
+import argparse
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from . import cli_worker, fund, logs, metrics, volume
+from .balances import balance_cache
+from .config import cfg
+from .governor import governor
+
+log = logs.get_logger("worker")
+
+
+def create_worker_app():
+    app = FastAPI()
+
+    @app.on_event("shutdown")
+    def on_shutdown():
+        volume.stop()
+        cli_worker.pool.close()
+        logs.close()
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok", "shard": cfg.shard_index, "shards": cfg.shard_count}
+
+    @app.post("/volume/start")
+    def volume_start():
+        ok, msg = volume.start()
+        if not ok:
+            return JSONResponse({"ok": ok, "message": msg}, status_code=400)
+        volume.resume_jobs()
+        return {"ok": ok, "message": msg}
+
+    @app.post("/volume/stop")
+    def volume_stop():
+        volume.stop()
+        return {"ok": True}
+
+    @app.post("/volume/rate")
+    def volume_rate(body: dict):
+        limits = {k: body[k] for k in ("jobs_per_minute", "max_in_flight", "agent_jobs_per_minute") if k in body}
+        return governor.configure(**limits)
+
+    @app.get("/volume/status")
+    def volume_status():
+        return volume.status()
+
+    @app.post("/fund/demand")
+    def fund_demand():
+        """Hand the main app's scheduler the spend and top-up requests queued since its last pull."""
+        return fund.scheduler.drain_demand()
+
+    @app.post("/fund/credit")
+    def fund_credit(body: dict):
+        for address, amount in body.items():
+            balance_cache.adjust(address, float(amount))
+        return {"ok": True}
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    def prometheus_metrics():
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+    return app
+
+
+def main():
+    p = argparse.ArgumentParser(description="Run one volume worker.")
+    p.add_argument("--port", type=int, required=True)
+    args = p.parse_args()
+    log.info(f"[worker] Shard {cfg.shard_index}/{cfg.shard_count} listening on 127.0.0.1:{args.port}")
+    uvicorn.run(create_worker_app(), host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
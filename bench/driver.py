@@ -0,0 +1,220 @@
+"""Load-test the volume engine against bench/mock_server.py.
+
+    python -m bench.driver                         # 10, 100, 1000 agents, 60s each
+    python -m bench.driver --agents 10,100 --duration 30 --engine async
+    python -m bench.driver --agents 100 --events   # track jobs over the mock job socket too
+
+The mock server runs in its own process so its CPU isn't charged to the bot.
+Each scale runs in a fresh child process with its own wallets, journal and
+result store. The child funds its agents through app.fund, runs
+app.volume for --duration seconds, and reports the following. The parent
+then prints a table.
+
+    jobs/s     completed jobs per second
+    p50/p99    seconds from create to COMPLETED (from the job journal)
+    req/job    upstream requests seen by the mock per created job
+    cpu%       bot process CPU time / wall time
+    rss_mb     bot process peak RSS
+    fund_s     wall time of the initial do_fund()
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+MASTER_WALLET_ID = "wallet-master"
+MASTER_ADDRESS = "0x" + "ee" * 20
+
+
+def _http(url, body=None):
+    data = None if body is None else json.dumps(body).encode()
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=10) as r:
+        return json.loads(r.read())
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def _auth_key_pem():
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    return key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()).decode()
+
+
+# -- child: one scale, in its own process --
+
+def _child(args):
+    base = f"http://127.0.0.1:{args.port}"
+    workdir = tempfile.mkdtemp(prefix="acp-bench-")
+    os.chdir(workdir)
+    os.environ.update({
+        "ACP_API_BASE_URL": base,
+        "PRIVY_API_BASE": f"{base}/privy",
+        "BASE_RPC_URL": f"{base}/rpc",
+        "ACP_JOB_EVENTS": "1" if args.events else "0",
+        "ACP_SOCKET_URL": f"http://127.0.0.1:{args.port + 1}",
+        "ACP_SOCKET_TRANSPORTS": "polling",
+        "VOLUME_ENGINE": args.engine,
+        "LOG_LEVEL": "error",
+        "JOB_JOURNAL": os.path.join(workdir, "jobs.db"),
+        "RESULTS_DB": os.path.join(workdir, "results.db"),
+        "DELIVERABLES_LOG": os.path.join(workdir, "deliverables.log"),
+        "PRIVY_APP_ID": "bench",
+        "PRIVY_APP_SECRET": "bench",
+        "PRIVY_AUTH_KEY": _auth_key_pem(),
+        "PRIVY_MASTER_WALLET_ID": MASTER_WALLET_ID,
+        "PRIVY_MASTER_WALLET_ADDRESS": MASTER_ADDRESS,
+    })
+    with open("wallets.json", "w") as f:
+        json.dump([{
+            "name": f"bench-{i:04d}",
+            "privy_wallet_id": f"wallet-{i}",
+            "acp_wallet": f"0x{i + 1:040x}",
+            "acp_api_key": f"key-{i}",
+        } for i in range(args.agents)], f)
+
+    from app import volume
+    from app.config import cfg
+    from app.events import job_events
+    from app.fund import do_fund, scheduler
+    from app.journal import journal
+
+    cfg.num_agents = args.agents
+    cfg.min_sleep = cfg.max_sleep = args.think_sec
+
+    t0 = time.monotonic()
+    fund = do_fund()
+    fund_sec = time.monotonic() - t0
+
+    ru0, wall0, started_at = resource.getrusage(resource.RUSAGE_SELF), time.monotonic(), time.time()
+    scheduler.start()
+    ok, msg = volume.start()
+    if not ok:
+        raise SystemExit(f"volume.start failed: {msg}")
+    time.sleep(args.duration)
+    volume.stop()
+    scheduler.stop()
+    deadline = time.monotonic() + 15
+    while volume.running() and time.monotonic() < deadline:
+        time.sleep(0.1)
+    ru1, wall = resource.getrusage(resource.RUSAGE_SELF), time.monotonic() - wall0
+
+    rows = journal().page(limit=10 ** 9, status="completed")["jobs"]
+    times = [r["finished_at"] - r["created_at"] for r in rows if r["created_at"] >= started_at]
+    cpu = (ru1.ru_utime - ru0.ru_utime) + (ru1.ru_stime - ru0.ru_stime)
+    result = {
+        "agents": args.agents,
+        "engine": args.engine,
+        "duration_sec": round(wall, 2),
+        "completed": len(times),
+        "outcomes": volume.stats(),
+        "jobs_per_sec": round(len(times) / args.duration, 3),
+        "p50_sec": _percentile(times, 0.50),
+        "p99_sec": _percentile(times, 0.99),
+        "cpu_pct": round(100 * cpu / wall, 1),
+        "rss_mb": round(ru1.ru_maxrss / 1024, 1),
+        "fund_sec": round(fund_sec, 3),
+        "funded": fund.get("successful", 0),
+        "events_received": job_events.stats()["events_received"],
+    }
+    print("RESULT " + json.dumps(result), flush=True)
+    os._exit(0)
+
+
+# -- parent --
+
+def _run_scale(args, agents):
+    base = f"http://127.0.0.1:{args.port}"
+    # Master holds enough for MAX_FUND_PER_WALLET-capped 1 USDC per agent; agents start empty.
+    _http(f"{base}/_reset", {"balances": {MASTER_ADDRESS: float(agents)}, "wallets": {MASTER_WALLET_ID: MASTER_ADDRESS},
+                             "keys": {f"key-{i}": f"0x{i + 1:040x}" for i in range(agents)}})
+    cmd = [sys.executable, "-m", "bench.driver", "--child", "--agents", str(agents), "--port", str(args.port),
+           "--duration", str(args.duration), "--engine", args.engine, "--think-sec", str(args.think_sec)]
+    if args.events:
+        cmd.append("--events")
+    out = subprocess.run(cmd, capture_output=True, text=True, cwd=_repo_root())
+    line = next((l for l in out.stdout.splitlines() if l.startswith("RESULT ")), None)
+    if line is None:
+        raise SystemExit(f"bench child for {agents} agents failed:\n{out.stderr[-2000:]}")
+    result = json.loads(line[len("RESULT "):])
+    stats = _http(f"{base}/_stats")
+    jobs = max(stats["jobs"], 1)
+    job_routes = {k: v for k, v in stats["requests"].items() if k.startswith("acp.")}
+    result["requests_per_job"] = round(sum(stats["requests"].values()) / jobs, 2)
+    result["acp_requests_per_job"] = round(sum(job_routes.values()) / jobs, 2)
+    result["requests"] = stats["requests"]
+    return result
+
+
+def _repo_root():
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _table(results):
+    cols = [("agents", "agents"), ("engine", "engine"), ("jobs_per_sec", "jobs/s"), ("p50_sec", "p50"),
+            ("p99_sec", "p99"), ("requests_per_job", "req/job"), ("cpu_pct", "cpu%"), ("rss_mb", "rss_mb"),
+            ("fund_sec", "fund_s")]
+    fmt = lambda v: "-" if v is None else f"{v:.2f}" if isinstance(v, float) else str(v)
+    rows = [[fmt(r.get(k)) for k, _ in cols] for r in results]
+    widths = [max(len(h), *(len(row[i]) for row in rows)) for i, (_, h) in enumerate(cols)]
+    lines = ["  ".join(h.rjust(w) for (_, h), w in zip(cols, widths))]
+    lines += ["  ".join(v.rjust(w) for v, w in zip(row, widths)) for row in rows]
+    return "\n".join(lines)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Load-test the volume engine against a local mock server.")
+    p.add_argument("--agents", default="10,100,1000", help="comma-separated agent counts")
+    p.add_argument("--duration", type=float, default=60, help="seconds of volume per scale")
+    p.add_argument("--engine", default="threads", choices=("threads", "async"))
+    p.add_argument("--think-sec", type=int, default=0, help="per-agent sleep between jobs (min/max_sleep)")
+    p.add_argument("--port", type=int, default=8790)
+    p.add_argument("--phase-sec", type=float, default=2.0)
+    p.add_argument("--fail-rate", type=float, default=0.0)
+    p.add_argument("--error-rate", type=float, default=0.0)
+    p.add_argument("--latency-ms", type=float, default=5.0)
+    p.add_argument("--events", action="store_true", help="run the mock job socket on --port + 1 and use it")
+    p.add_argument("--json", action="store_true", help="print raw results as JSON")
+    p.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = p.parse_args()
+
+    if args.child:
+        args.agents = int(args.agents)
+        return _child(args)
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "bench.mock_server", "--port", str(args.port), "--phase-sec", str(args.phase_sec),
+         "--fail-rate", str(args.fail_rate), "--error-rate", str(args.error_rate),
+         "--latency-ms", str(args.latency_ms), "--default-balance", "0"]
+        + (["--socket-port", str(args.port + 1)] if args.events else []),
+        cwd=_repo_root(), stdout=subprocess.DEVNULL)
+    try:
+        for _ in range(50):
+            try:
+                _http(f"http://127.0.0.1:{args.port}/_stats")
+                break
+            except OSError:
+                time.sleep(0.1)
+        results = [_run_scale(args, int(n)) for n in args.agents.split(",")]
+    finally:
+        server.terminate()
+        server.wait()
+    print(json.dumps(results, indent=2) if args.json else _table(results))
+
+
+if __name__ == "__main__":
+    main()
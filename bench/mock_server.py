@@ -0,0 +1,350 @@
+"""Local stand-in for the ACP API, Privy and the Base JSON-RPC endpoint.
+
+Run it on its own:
+
+    python -m bench.mock_server --port 8790 --phase-sec 2 --fail-rate 0.05
+
+or start it from a script with `serve(port, MockSettings(...))`. Routes:
+
+    POST /acp/jobs                   create a job (phases play out over time)
+    GET  /acp/jobs/{id}              job status in the shape app/acp.py expects
+    POST /privy/wallets              create a wallet
+    GET  /privy/wallets/{id}         wallet details
+    POST /privy/wallets/{id}/rpc     eth_sendTransaction; USDC transfer/approve and
+                                     disperseToken move ledger balances
+    POST /rpc                        eth_call balanceOf/allowance, single or batched
+    GET  /_stats                     request counts per route, jobs by outcome
+    POST /_reset                     clear state; body may seed {"balances": {addr: usdc}, "wallets": {id: addr},
+                                     "keys": {acp_api_key: wallet address}}
+
+Point the bot at it with ACP_API_BASE_URL=http://127.0.0.1:8790,
+PRIVY_API_BASE=http://127.0.0.1:8790/privy and BASE_RPC_URL=http://127.0.0.1:8790/rpc.
+
+With --socket-port it also runs a socket.io stand-in for the ACP job
+socket. A client that connects with auth {"walletAddress": ...} gets an
+onNewTask event ({"id", "phase"}) every time one of that wallet's jobs
+changes phase; "keys" in /_reset says which wallet an API key belongs to
+(jobs from unknown keys are broadcast). It serves the polling transport
+only, since the stdlib WSGI server can't upgrade to websockets, so run the
+bot with ACP_SOCKET_URL=http://127.0.0.1:<socket-port> and
+ACP_SOCKET_TRANSPORTS=polling.
+"""
+
+import argparse
+import heapq
+import itertools
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+PHASES = ("REQUEST", "NEGOTIATION", "TRANSACTION", "EVALUATION")
+TRANSFER_SELECTOR = "a9059cbb"
+APPROVE_SELECTOR = "095ea7b3"
+DISPERSE_TOKEN_SELECTOR = "c73a2d60"
+BALANCE_OF_SELECTOR = "70a08231"
+ALLOWANCE_SELECTOR = "dd62ed3e"
+
+
+@dataclass
+class MockSettings:
+    phase_sec: float = 2.0          # mean time spent in each phase (exponentially distributed)
+    fail_rate: float = 0.0          # share of jobs that end REJECTED instead of COMPLETED
+    error_rate: float = 0.0         # share of requests answered with HTTP 500
+    latency_ms: float = 5.0         # mean added latency per request
+    default_balance: float = 10.0   # USDC held by any address the ledger hasn't seen
+    job_price: float = 0.01
+
+
+class _State:
+    def __init__(self, settings):
+        self.settings = settings
+        self.lock = threading.Lock()
+        self.on_job = None
+        self.reset()
+
+    def reset(self, balances=None, wallets=None, keys=None):
+        with self.lock:
+            self.ids = itertools.count(1)
+            self.jobs = {}
+            self.balances = {a.lower(): float(v) for a, v in (balances or {}).items()}
+            self.allowances = {}
+            self.wallets = {i: {"id": i, "address": a.lower(), "chain_type": "ethereum"}
+                            for i, a in (wallets or {}).items()}
+            self.keys = {k: a.lower() for k, a in (keys or {}).items()}
+            self.requests = {}
+
+    def count(self, route):
+        with self.lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+
+    def new_job(self, api_key=None):
+        s = self.settings
+        now = time.time()
+        # Cumulative end time of each phase.
+        ends, t = [], now
+        for _ in PHASES:
+            t += random.expovariate(1 / s.phase_sec) if s.phase_sec > 0 else 0
+            ends.append(t)
+        final = "REJECTED" if random.random() < s.fail_rate else "COMPLETED"
+        with self.lock:
+            job_id = next(self.ids)
+            self.jobs[job_id] = {"ends": ends, "final": final}
+            wallet = self.keys.get(api_key)
+        if self.on_job is not None:
+            self.on_job(job_id, wallet, ends, final)
+        return job_id
+
+    def job_phase(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is None:
+            return None, None
+        now = time.time()
+        for phase, end in zip(PHASES, job["ends"]):
+            if now < end:
+                return phase, job
+        return job["final"], job
+
+    def balance(self, address):
+        with self.lock:
+            return self.balances.get(address.lower(), self.settings.default_balance)
+
+    def transfer(self, source, to, amount):
+        with self.lock:
+            d = self.settings.default_balance
+            self.balances[source] = self.balances.get(source, d) - amount
+            self.balances[to] = self.balances.get(to, d) + amount
+
+    def approve(self, owner, spender, amount):
+        with self.lock:
+            self.allowances[(owner, spender)] = amount
+
+    def allowance(self, owner, spender):
+        with self.lock:
+            return self.allowances.get((owner.lower(), spender.lower()), 0.0)
+
+    def disperse(self, source, spender, transfers):
+        total = sum(v for _, v in transfers)
+        with self.lock:
+            if self.allowances.get((source, spender), 0.0) + 1e-9 < total:
+                return False
+            self.allowances[(source, spender)] -= total
+        for to, amount in transfers:
+            self.transfer(source, to, amount)
+        return True
+
+    def stats(self):
+        with self.lock:
+            outcomes = {}
+            now = time.time()
+            for job in self.jobs.values():
+                key = job["final"] if now >= job["ends"][-1] else "open"
+                outcomes[key] = outcomes.get(key, 0) + 1
+            return {"requests": dict(self.requests), "jobs": len(self.jobs), "outcomes": outcomes}
+
+
+def _handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, code, obj):
+            body = json.dumps(obj).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self):
+            n = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(n) or b"null")
+
+        def _simulate(self, route):
+            state.count(route)
+            s = state.settings
+            if s.latency_ms > 0:
+                time.sleep(random.expovariate(1000 / s.latency_ms))
+            if s.error_rate and random.random() < s.error_rate:
+                state.count(f"{route}:500")
+                self._send(500, {"error": "simulated failure"})
+                return False
+            return True
+
+        def do_GET(self):
+            parts = self.path.strip("/").split("/")
+            if self.path == "/_stats":
+                return self._send(200, state.stats())
+            if parts[:2] == ["acp", "jobs"] and len(parts) == 3:
+                if not self._simulate("acp.job_status"):
+                    return
+                phase, job = state.job_phase(int(parts[2]) if parts[2].isdigit() else -1)
+                if phase is None:
+                    return self._send(404, {"error": "job not found"})
+                data = {"phase": phase, "price": state.settings.job_price}
+                if phase == "COMPLETED":
+                    data["deliverable"] = {"value": f"Simulated answer for job {parts[2]}."}
+                return self._send(200, {"data": data})
+            if parts[:2] == ["privy", "wallets"] and len(parts) == 3:
+                if not self._simulate("privy.get_wallet"):
+                    return
+                wallet = state.wallets.get(parts[2])
+                return self._send(200, wallet) if wallet else self._send(404, {"error": "wallet not found"})
+            self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            body = self._body()
+            parts = self.path.strip("/").split("/")
+            if self.path == "/_reset":
+                body = body or {}
+                state.reset(body.get("balances"), body.get("wallets"), body.get("keys"))
+                return self._send(200, {"ok": True})
+            if self.path == "/acp/jobs":
+                if not self._simulate("acp.create_job"):
+                    return
+                return self._send(201, {"data": {"jobId": state.new_job(self.headers.get("x-api-key"))}})
+            if self.path == "/rpc":
+                calls = body if isinstance(body, list) else [body]
+                if not self._simulate("rpc.batch" if isinstance(body, list) else "rpc.eth_call"):
+                    return
+                replies = [self._eth_call(c) for c in calls]
+                return self._send(200, replies if isinstance(body, list) else replies[0])
+            if parts[:2] == ["privy", "wallets"] and len(parts) == 2:
+                if not self._simulate("privy.create_wallet"):
+                    return
+                n = len(state.wallets) + 1
+                wallet = {"id": f"wallet-{n}", "address": f"0x{n:040x}", "chain_type": "ethereum"}
+                state.wallets[wallet["id"]] = wallet
+                return self._send(200, wallet)
+            if parts[:2] == ["privy", "wallets"] and parts[3:] == ["rpc"]:
+                if not self._simulate("privy.send_transaction"):
+                    return
+                tx = ((body or {}).get("params") or {}).get("transaction") or {}
+                data = (tx.get("data") or "").removeprefix("0x")
+                source = (state.wallets.get(parts[2]) or {}).get("address", parts[2]).lower()
+                words = [data[8 + i:8 + i + 64] for i in range(0, len(data) - 8, 64)]
+                if data.startswith(TRANSFER_SELECTOR):
+                    state.transfer(source, "0x" + words[0][-40:], int(words[1], 16) / 1e6)
+                elif data.startswith(APPROVE_SELECTOR):
+                    state.approve(source, "0x" + words[0][-40:], int(words[1], 16) / 1e6)
+                elif data.startswith(DISPERSE_TOKEN_SELECTOR):
+                    n = int(words[int(words[1], 16) // 32], 16)
+                    first_to, first_value = int(words[1], 16) // 32 + 1, int(words[2], 16) // 32 + 1
+                    transfers = [("0x" + words[first_to + k][-40:], int(words[first_value + k], 16) / 1e6)
+                                 for k in range(n)]
+                    if not state.disperse(source, (tx.get("to") or "").lower(), transfers):
+                        return self._send(400, {"error": "execution reverted: insufficient allowance"})
+                return self._send(200, {"data": {"hash": f"0x{random.getrandbits(256):064x}", "caip2": "eip155:8453"}})
+            self._send(404, {"error": "not found"})
+
+        def _eth_call(self, call):
+            data = (((call.get("params") or [{}])[0]) or {}).get("data", "").removeprefix("0x")
+            if call.get("method") == "eth_call" and data.startswith(ALLOWANCE_SELECTOR):
+                owner, spender = "0x" + data[8:72][-40:], "0x" + data[72:136][-40:]
+                return {"jsonrpc": "2.0", "id": call.get("id"), "result": hex(int(state.allowance(owner, spender) * 1e6))}
+            if call.get("method") != "eth_call" or not data.startswith(BALANCE_OF_SELECTOR):
+                return {"jsonrpc": "2.0", "id": call.get("id"), "error": {"code": -32601, "message": "unsupported"}}
+            address = "0x" + data[8:72][-40:]
+            raw = int(state.balance(address) * 1e6)
+            return {"jsonrpc": "2.0", "id": call.get("id"), "result": hex(max(raw, 0))}
+
+    return Handler
+
+
+class _Server(ThreadingHTTPServer):
+    # A thousand agents connect at once on start; the default backlog of 5 resets most of them.
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class _WSGIServer(ThreadingMixIn, WSGIServer):
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class _QuietWSGIHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def _socket_server(state, host, port):
+    """socket.io stand-in: emits onNewTask to a job's wallet room at every phase change."""
+    import socketio  # only needed with --socket-port
+
+    sio = socketio.Server(async_mode="threading", transports=["polling"])
+    due = []
+    cond = threading.Condition()
+
+    @sio.event
+    def connect(sid, environ, auth):
+        wallet = ((auth or {}).get("walletAddress") or "").lower()
+        if wallet:
+            sio.enter_room(sid, wallet)
+        sio.emit("roomJoined", {"walletAddress": wallet}, to=sid)
+
+    def on_job(job_id, wallet, ends, final):
+        with cond:
+            for end, phase in zip(ends, PHASES[1:] + (final,)):
+                heapq.heappush(due, (end, job_id, phase, wallet))
+            cond.notify()
+
+    def emitter():
+        while True:
+            with cond:
+                while not due or due[0][0] > time.time():
+                    cond.wait(max(due[0][0] - time.time(), 0) if due else None)
+                _, job_id, phase, wallet = heapq.heappop(due)
+            sio.emit("onNewTask", {"id": job_id, "phase": phase}, to=wallet)
+
+    state.on_job = on_job
+    threading.Thread(target=emitter, daemon=True).start()
+    server = _WSGIServer((host, port), _QuietWSGIHandler)
+    server.set_app(socketio.WSGIApp(sio))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def serve(port=8790, settings=None, host="127.0.0.1", socket_port=None):
+    """Start the mock server on a daemon thread; returns the server (call .shutdown() to stop).
+
+    With `socket_port`, the socket.io stand-in listens there too (server.socket_server).
+    """
+    state = _State(settings or MockSettings())
+    server = _Server((host, port), _handler(state))
+    server.state = state
+    server.socket_server = _socket_server(state, host, socket_port) if socket_port else None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8790)
+    p.add_argument("--phase-sec", type=float, default=MockSettings.phase_sec)
+    p.add_argument("--fail-rate", type=float, default=MockSettings.fail_rate)
+    p.add_argument("--error-rate", type=float, default=MockSettings.error_rate)
+    p.add_argument("--latency-ms", type=float, default=MockSettings.latency_ms)
+    p.add_argument("--default-balance", type=float, default=MockSettings.default_balance)
+    p.add_argument("--socket-port", type=int, help="also serve the socket.io job events stand-in on this port")
+    args = p.parse_args()
+    settings = MockSettings(args.phase_sec, args.fail_rate, args.error_rate, args.latency_ms, args.default_balance)
+    server = serve(args.port, settings, args.host, args.socket_port)
+    print(f"mock ACP/Privy/RPC listening on http://{args.host}:{args.port}", flush=True)
+    if args.socket_port:
+        print(f"mock ACP job socket listening on http://{args.host}:{args.socket_port}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Micro-benchmark for PrivyClient request signing.
+
+    python -m bench.sign_bench --n 2000
+
+Times building one signed eth_sendTransaction request (a USDC transfer),
+broken into its parts:
+
+    ecdsa       P-256 signature over a precomputed SHA-256 digest
+    serialize   canonical_json() of the transaction body
+    headers     copying the cached static headers
+    signed      _signed_request(): serialize + hash + sign + headers
+    legacy      the previous path: json.dumps for the signature, headers
+                rebuilt with base64 per call, then requests' own json.dumps
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import time
+
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec, utils
+
+from .driver import _auth_key_pem
+
+
+def _client():
+    os.environ.setdefault("PRIVY_APP_ID", "bench-app")
+    os.environ.setdefault("PRIVY_APP_SECRET", "bench-secret")
+    os.environ["PRIVY_AUTH_KEY"] = _auth_key_pem()
+    os.environ.pop("PRIVY_AUTH_KEY_PATH", None)
+    from app.privy import PrivyClient
+    return PrivyClient()
+
+
+def _body(client, i):
+    to = f"0x{i + 1:040x}"
+    return {
+        "method": "eth_sendTransaction",
+        "caip2": "eip155:8453",
+        "params": {"transaction": {"to": "0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913",
+                                   "data": client.encode_usdc_transfer(to, 1.0), "value": "0x0"}},
+    }
+
+
+def _legacy(client, body):
+    creds = base64.b64encode(f"{client.app_id}:{client.app_secret}".encode()).decode()
+    headers = {"Authorization": f"Basic {creds}", "privy-app-id": client.app_id, "Content-Type": "application/json"}
+    headers["privy-authorization-signature"] = client._sign_authorization(json.dumps(body).encode())
+    return json.dumps(body).encode(), headers  # requests serializes json= again
+
+
+def _rate(fn, n):
+    start = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    return {"per_sec": round(n / elapsed), "us_per_op": round(1e6 * elapsed / n, 1)}
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark Privy request signing.")
+    p.add_argument("--n", type=int, default=2000)
+    args = p.parse_args()
+
+    from app.privy import canonical_json
+
+    client = _client()
+    bodies = [_body(client, i) for i in range(args.n)]
+    digest = hashlib.sha256(b"x").digest()
+    algo = ec.ECDSA(utils.Prehashed(hashes.SHA256()))
+    key = client._auth_private_key
+
+    results = {
+        "ecdsa": _rate(lambda i: key.sign(digest, algo), args.n),
+        "serialize": _rate(lambda i: canonical_json(bodies[i]), args.n),
+        "headers": _rate(lambda i: client._base_headers(), args.n),
+        "signed": _rate(lambda i: client._signed_request(bodies[i]), args.n),
+        "legacy": _rate(lambda i: _legacy(client, bodies[i]), args.n),
+    }
+    width = max(map(len, results))
+    for name, r in results.items():
+        print(f"{name.ljust(width)}  {r['per_sec']:>9}/s  {r['us_per_op']:>8} us")
+
+
+if __name__ == "__main__":
+    main()
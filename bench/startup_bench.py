@@ -0,0 +1,134 @@
+"""Cold-start benchmark: process launch to first job.
+
+    python -m bench.startup_bench --runs 5
+
+Starts bench/mock_server.py and provisions cfg.num_agents wallets (API keys
+included, so setup has nothing to create). It then launches the real
+service (uvicorn main:app) --runs times each with FAST_START=0 and
+FAST_START=1. Agents hold enough USDC to run but less than a fresh fund
+would give them, so the fund step has transfers to make, as after any
+restart. Per launch it records:
+
+    import_s     `import app` alone, in a fresh interpreter
+    health_s     launch -> first 200 from /health
+    first_job_s  launch -> first job created on the mock
+
+and prints the median of each per mode.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from .driver import MASTER_ADDRESS, MASTER_WALLET_ID, _auth_key_pem, _http, _repo_root
+
+
+def _import_time():
+    code = "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=_repo_root(),
+                         env=dict(os.environ, LOG_LEVEL="error"))
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def _get_ok(url):
+    try:
+        with urllib.request.urlopen(url, timeout=1) as r:
+            return r.status == 200
+    except OSError:
+        return False
+
+
+def _launch(args, agents, fast, env):
+    base = f"http://127.0.0.1:{args.port}"
+    addresses = [f"0x{i + 1:040x}" for i in range(agents)]
+    _http(f"{base}/_reset", {"balances": {MASTER_ADDRESS: 100.0, **{a: 0.6 for a in addresses}},
+                             "wallets": {MASTER_WALLET_ID: MASTER_ADDRESS}})
+    workdir = tempfile.mkdtemp(prefix="acp-startup-")
+    with open(os.path.join(workdir, "wallets.json"), "w") as f:
+        json.dump([{"name": f"bench-{i:04d}", "privy_wallet_id": f"wallet-{i}", "acp_wallet": a,
+                    "acp_api_key": f"key-{i}"} for i, a in enumerate(addresses)], f)
+    cmd = [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", _repo_root(),
+           "--port", str(args.app_port), "--log-level", "warning"]
+    started = time.monotonic()
+    proc = subprocess.Popen(cmd, cwd=workdir, env=dict(env, FAST_START="1" if fast else "0"),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    health = first_job = None
+    try:
+        deadline = started + args.timeout
+        while time.monotonic() < deadline and first_job is None:
+            if health is None and _get_ok(f"http://127.0.0.1:{args.app_port}/health"):
+                health = time.monotonic() - started
+            if _http(f"{base}/_stats")["requests"].get("acp.create_job"):
+                first_job = time.monotonic() - started
+            time.sleep(0.01)
+    finally:
+        proc.terminate()
+        proc.wait()
+    return {"health_s": health, "first_job_s": first_job}
+
+
+def main():
+    p = argparse.ArgumentParser(description="Measure cold start to first job, with and without FAST_START.")
+    p.add_argument("--runs", type=int, default=5)
+    p.add_argument("--port", type=int, default=8791, help="mock server port")
+    p.add_argument("--app-port", type=int, default=5055)
+    p.add_argument("--latency-ms", type=float, default=50.0, help="mean mock latency per upstream request")
+    p.add_argument("--timeout", type=float, default=60.0)
+    p.add_argument("--json", action="store_true")
+    args = p.parse_args()
+
+    sys.path.insert(0, _repo_root())
+    from app.config import Config
+    agents = Config().num_agents
+
+    base = f"http://127.0.0.1:{args.port}"
+    env = dict(os.environ, **{
+        "ACP_API_BASE_URL": base,
+        "PRIVY_API_BASE": f"{base}/privy",
+        "BASE_RPC_URL": f"{base}/rpc",
+        "ACP_JOB_EVENTS": "0",
+        "LOG_LEVEL": "error",
+        "PRIVY_APP_ID": "bench",
+        "PRIVY_APP_SECRET": "bench",
+        "PRIVY_AUTH_KEY": _auth_key_pem(),
+        "PRIVY_MASTER_WALLET_ID": MASTER_WALLET_ID,
+        "PRIVY_MASTER_WALLET_ADDRESS": MASTER_ADDRESS,
+    })
+    env.pop("PRIVY_AUTH_KEY_PATH", None)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "bench.mock_server", "--port", str(args.port), "--latency-ms", str(args.latency_ms),
+         "--default-balance", "0"], cwd=_repo_root(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        for _ in range(50):
+            try:
+                _http(f"{base}/_stats")
+                break
+            except OSError:
+                time.sleep(0.1)
+        results = {}
+        for fast in (False, True):
+            runs = [dict(_launch(args, agents, fast, env), import_s=_import_time()) for _ in range(args.runs)]
+            results["fast" if fast else "serial"] = {
+                k: round(statistics.median(r[k] for r in runs if r[k] is not None), 3)
+                if any(r[k] is not None for r in runs) else None
+                for k in ("import_s", "health_s", "first_job_s")}
+    finally:
+        server.terminate()
+        server.wait()
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'mode':<8}{'import_s':>10}{'health_s':>10}{'first_job_s':>13}")
+    fmt = lambda v: "-" if v is None else f"{v:.3f}"
+    for mode, r in results.items():
+        print(f"{mode:<8}{fmt(r['import_s']):>10}{fmt(r['health_s']):>10}{fmt(r['first_job_s']):>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,8 @@
 //   --version    Show version
 // =============================================================================
 
+import * as fs from "fs";
+import { fileURLToPath } from "url";
 import { setJsonMode } from "../src/lib/output.js";
 import { requireApiKey } from "../src/lib/config.js";
 
@@ -282,12 +284,13 @@ function buildCommandHelp(command: string): string | undefined {
 
 // -- Main --
 
-async function main(): Promise<void> {
-  let args = process.argv.slice(2);
+/** Run one CLI invocation. Exported so bin/worker.ts can reuse it in-process. */
+export async function run(argv: string[]): Promise<void> {
+  let args = argv;
 
   // Global flags
   const jsonFlag = hasFlag(args, "--json") || process.env.ACP_JSON === "1";
-  if (jsonFlag) setJsonMode(true);
+  setJsonMode(jsonFlag);
   args = removeFlags(args, "--json");
 
   if (hasFlag(args, "--version", "-v")) {
@@ -492,9 +495,24 @@ async function main(): Promise<void> {
   }
 }
 
-main().catch((e) => {
-  console.error(
-    JSON.stringify({ error: e instanceof Error ? e.message : String(e) })
-  );
-  process.exit(1);
-});
+// Only run when executed directly (possibly via a bin symlink), not when
+// imported by the worker.
+function isEntrypoint(): boolean {
+  try {
+    return (
+      !!process.argv[1] &&
+      fs.realpathSync(process.argv[1]) === fs.realpathSync(fileURLToPath(import.meta.url))
+    );
+  } catch {
+    return false;
+  }
+}
+
+if (isEntrypoint()) {
+  run(process.argv.slice(2)).catch((e) => {
+    console.error(
+      JSON.stringify({ error: e instanceof Error ? e.message : String(e) })
+    );
+    process.exit(1);
+  });
+}
@@ -0,0 +1,97 @@
+#!/usr/bin/env npx tsx
+// =============================================================================
+// acp worker — long-lived CLI process for programmatic callers
+//
+// Pays Node startup and TypeScript transpile once instead of per command.
+// Reads newline-delimited JSON requests on stdin:
+//   {"id": 1, "args": ["agent", "create", "my-agent", "--json"]}
+// and writes one JSON line per request on stdout:
+//   {"id": 1, "code": 0, "stdout": "...", "stderr": "..."}
+//
+// Requests run one at a time so each command's output can be captured;
+// callers that want parallelism start several workers. Interactive
+// commands (setup, login, prompts) are not supported here.
+// =============================================================================
+
+import readline from "readline";
+import { run } from "./acp.js";
+
+interface WorkerRequest {
+  id?: unknown;
+  args?: unknown;
+}
+
+class ExitSignal extends Error {
+  constructor(public code: number) {
+    super(`process.exit(${code})`);
+  }
+}
+
+const writeOut = process.stdout.write.bind(process.stdout);
+const writeErr = process.stderr.write.bind(process.stderr);
+const realExit = process.exit.bind(process);
+const initialApiKey = process.env.LITE_AGENT_API_KEY;
+
+function reply(data: Record<string, unknown>): void {
+  writeOut(JSON.stringify(data) + "\n");
+}
+
+async function handle(line: string): Promise<void> {
+  let req: WorkerRequest;
+  try {
+    req = JSON.parse(line);
+  } catch {
+    reply({ id: null, code: 1, stdout: "", stderr: "Invalid request JSON" });
+    return;
+  }
+  const args = Array.isArray(req.args) ? req.args.map(String) : [];
+
+  let stdout = "";
+  let stderr = "";
+  let code = 0;
+
+  // Each command should see the environment a fresh process would.
+  if (initialApiKey === undefined) delete process.env.LITE_AGENT_API_KEY;
+  else process.env.LITE_AGENT_API_KEY = initialApiKey;
+
+  process.stdout.write = ((chunk: unknown) => {
+    stdout += String(chunk);
+    return true;
+  }) as typeof process.stdout.write;
+  process.stderr.write = ((chunk: unknown) => {
+    stderr += String(chunk);
+    return true;
+  }) as typeof process.stderr.write;
+  process.exit = ((exitCode?: number) => {
+    throw new ExitSignal(exitCode ?? 0);
+  }) as typeof process.exit;
+
+  try {
+    await run(args);
+  } catch (e) {
+    if (e instanceof ExitSignal) {
+      code = e.code;
+    } else {
+      code = 1;
+      stderr += JSON.stringify({ error: e instanceof Error ? e.message : String(e) }) + "\n";
+    }
+  } finally {
+    process.stdout.write = writeOut as typeof process.stdout.write;
+    process.stderr.write = writeErr as typeof process.stderr.write;
+    process.exit = realExit;
+  }
+
+  reply({ id: req.id ?? null, code, stdout, stderr });
+}
+
+const rl = readline.createInterface({ input: process.stdin });
+let queue: Promise<void> = Promise.resolve();
+
+rl.on("line", (line) => {
+  if (!line.trim()) return;
+  queue = queue.then(() => handle(line));
+});
+
+rl.on("close", () => {
+  queue.then(() => realExit(0));
+});
@@ -10,8 +10,10 @@ import { fileURLToPath } from "url";
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = path.dirname(__filename);
 
-/** Repo root — two levels up from src/lib/ */
-export const ROOT = path.resolve(__dirname, "..", "..");
+/** Repo root — two levels up from src/lib/, three from dist/src/lib/ in the precompiled build */
+const SRC_PARENT = path.resolve(__dirname, "..", "..");
+export const ROOT =
+  path.basename(SRC_PARENT) === "dist" ? path.dirname(SRC_PARENT) : SRC_PARENT;
 export const CONFIG_JSON_PATH = path.resolve(ROOT, "config.json");
 export const LOGS_DIR = path.resolve(ROOT, "logs");
 
@@ -0,0 +1,95 @@
+import threading
+import time
+
+import pytest
+
+from app.balances import BalanceCache, BalanceUnavailable
+from app.config import cfg
+
+
+def _start(n, fn):
+    out = []
+    threads = [threading.Thread(target=lambda: out.append(fn())) for _ in range(n)]
+    for t in threads:
+        t.start()
+    return out, threads
+
+
+def test_concurrent_misses_share_one_fetch():
+    gate, calls = threading.Event(), []
+
+    def fetch(address):
+        calls.append(address)
+        gate.wait(2)
+        return 7.0
+
+    cache = BalanceCache(fetch)
+    out, threads = _start(5, lambda: cache.get("0xAB"))
+    time.sleep(0.1)
+    gate.set()
+    for t in threads:
+        t.join()
+    assert out == [7.0] * 5
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 4
+    assert cache.get("0xab") == 7.0
+    assert len(calls) == 1
+
+
+def test_invalidate_during_fetch_is_not_cached():
+    gate = threading.Event()
+    cache = BalanceCache(lambda address: gate.wait(2) and 1.0)
+    out, threads = _start(3, lambda: cache.get("0xab"))
+    time.sleep(0.1)
+    cache.invalidate("0xab")
+    gate.set()
+    for t in threads:
+        t.join()
+    # Every caller still gets the owner's answer, but it isn't kept.
+    assert out == [1.0] * 3
+    assert cache.peek("0xab") is None
+
+
+def test_failed_lookup_reaches_waiters():
+    gate = threading.Event()
+
+    def fetch(address):
+        gate.wait(2)
+        raise BalanceUnavailable("rpc down")
+
+    cache = BalanceCache(fetch)
+    errors = []
+
+    def get():
+        try:
+            return cache.get("0xab")
+        except BalanceUnavailable as e:
+            errors.append(e)
+
+    _, threads = _start(3, get)
+    time.sleep(0.1)
+    gate.set()
+    for t in threads:
+        t.join()
+    assert len(errors) == 3
+    assert cache.stats()["errors"] == 1
+
+
+def test_stale_value_served_on_error(monkeypatch):
+    monkeypatch.setattr(cfg, "balance_cache_ttl", 0)
+    monkeypatch.setattr(cfg, "balance_stale_max", 60)
+    results = iter([3.0])
+
+    def fetch(address):
+        try:
+            return next(results)
+        except StopIteration:
+            raise BalanceUnavailable("rpc down")
+
+    cache = BalanceCache(fetch)
+    assert cache.get("0xab") == 3.0
+    assert cache.get("0xab") == 3.0
+    assert cache.stats()["stale"] == 1
+    monkeypatch.setattr(cfg, "balance_stale_max", 0)
+    with pytest.raises(BalanceUnavailable):
+        cache.get("0xab")
@@ -0,0 +1,82 @@
+import pytest
+
+from app import breaker
+from app.breaker import CLOSED, HALF_OPEN, OPEN, BreakerOpen, CircuitBreaker
+from app.config import cfg
+
+
+class Clock:
+    now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(breaker.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def circuit(clock, monkeypatch):
+    monkeypatch.setattr(cfg, "breaker_threshold", 3)
+    monkeypatch.setattr(cfg, "breaker_cooldown", 10)
+    monkeypatch.setattr(cfg, "breaker_max_cooldown", 120)
+    monkeypatch.setattr(cfg, "breaker_probe_timeout", 60)
+    return CircuitBreaker("test")
+
+
+def _trip(circuit):
+    for _ in range(cfg.breaker_threshold):
+        circuit.record(False)
+
+
+def test_opens_after_threshold(circuit):
+    circuit.record(False)
+    circuit.record(False)
+    assert circuit.state == CLOSED
+    circuit.record(False)
+    assert circuit.state == OPEN
+    with pytest.raises(BreakerOpen):
+        circuit.check()
+
+
+def test_half_open_lets_one_probe_through(circuit, clock):
+    _trip(circuit)
+    clock.now += 10
+    assert circuit.state == HALF_OPEN
+    assert circuit.allow()
+    assert not circuit.allow()
+    circuit.record(True)
+    assert circuit.state == CLOSED
+    assert circuit.allow()
+
+
+def test_failed_probe_doubles_the_cooldown(circuit, clock):
+    _trip(circuit)
+    clock.now += 10
+    assert circuit.allow()
+    circuit.record(False)
+    assert circuit.state == OPEN
+    assert circuit.retry_in() == 20
+    clock.now += 20
+    assert circuit.allow()
+
+
+def test_abandon_frees_the_probe(circuit, clock):
+    _trip(circuit)
+    clock.now += 10
+    assert circuit.allow()
+    circuit.abandon()
+    assert circuit.allow()
+    assert not circuit.allow()
+
+
+def test_lost_probe_is_written_off(circuit, clock):
+    _trip(circuit)
+    clock.now += 10
+    assert circuit.allow()
+    clock.now += 61
+    assert circuit.allow()
@@ -0,0 +1,58 @@
+import threading
+
+import pytest
+
+from app.config import cfg
+from app.governor import JobGovernor
+
+
+@pytest.fixture
+def governor(monkeypatch):
+    monkeypatch.setattr(cfg, "target_jobs_per_minute", 6000.0)
+    monkeypatch.setattr(cfg, "max_in_flight", 1)
+    monkeypatch.setattr(cfg, "agent_jobs_per_minute", 0.0)
+    monkeypatch.setattr(cfg, "rate_burst", 10)
+    return JobGovernor()
+
+
+def test_acquire_and_release(governor):
+    stop = threading.Event()
+    assert governor.acquire({"name": "a"}, stop)
+    assert governor.stats()["in_flight"] == 1
+    governor.release()
+    assert governor.stats()["in_flight"] == 0
+    assert governor.stats()["started"] == 1
+
+
+def test_queued_agent_waits_for_a_slot(governor):
+    stop = threading.Event()
+    assert governor.acquire({"name": "a"}, stop)
+    admitted = threading.Event()
+    t = threading.Thread(target=lambda: governor.acquire({"name": "b"}, stop) and admitted.set())
+    t.start()
+    assert not admitted.wait(0.3)
+    assert governor.stats()["queued"] == 1
+    governor.release()
+    assert admitted.wait(2)
+    t.join()
+    stats = governor.stats()
+    assert (stats["in_flight"], stats["queued"], stats["started"]) == (1, 0, 2)
+
+
+def test_disabling_releases_waiters(governor):
+    stop = threading.Event()
+    assert governor.acquire({"name": "a"}, stop)
+    result = []
+    t = threading.Thread(target=lambda: result.append(governor.acquire({"name": "b"}, stop)))
+    t.start()
+    governor.configure(jobs_per_minute=0)
+    t.join(3)
+    assert result == [False]
+    assert governor.stats()["queued"] == 0
+
+
+def test_stop_returns_false(governor):
+    stop = threading.Event()
+    stop.set()
+    assert governor.acquire({"name": "a"}, stop) is False
+    assert governor.stats()["in_flight"] == 0
@@ -0,0 +1,58 @@
+import sqlite3
+
+import pytest
+
+from app.journal import JobJournal
+
+
+@pytest.fixture
+def jobs(tmp_path):
+    return JobJournal(str(tmp_path / "jobs.db"))
+
+
+def test_flush_and_read_back(jobs):
+    jobs.created(1, "a", "q?")
+    jobs.phase(1, "TRANSACTION")
+    jobs.created(2, "b", "q2?")
+    jobs.finished(2, "completed")
+    assert [r["job_id"] for r in jobs.unfinished()] == ["1"]
+    job = jobs.get(1)
+    assert job["phase"] == "TRANSACTION"
+    assert [p["phase"] for p in job["phases"]] == ["TRANSACTION"]
+    assert jobs.page(status="completed")["total"] == 1
+
+
+def test_failed_flush_is_retried(jobs):
+    jobs._conn.execute("PRAGMA busy_timeout=0")
+    other = sqlite3.connect(jobs.path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    jobs.created(1, "a", "q?")
+    with pytest.raises(sqlite3.OperationalError):
+        jobs.flush()
+    other.execute("ROLLBACK")
+    other.close()
+    jobs.created(2, "a", "q2?")
+    jobs.flush()
+    assert sorted(r["job_id"] for r in jobs.unfinished()) == ["1", "2"]
+
+
+def test_recovery_after_restart(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    first = JobJournal(path)
+    first.created(1, "a", "q?")
+    first.created(2, "a", "q2?")
+    first.finished(2, "completed")
+    first.flush()
+    assert [r["job_id"] for r in JobJournal(path).unfinished()] == ["1"]
+
+
+def test_adopt_moves_open_jobs(tmp_path):
+    source = JobJournal(str(tmp_path / "jobs.0.db"))
+    target = JobJournal(str(tmp_path / "jobs.1.db"))
+    source.created(1, "a", "q?")
+    source.phase(1, "NEGOTIATION")
+    source.created(2, "b", "q2?")
+    assert target.adopt({"a"}, source) == 1
+    assert [r["job_id"] for r in target.unfinished()] == ["1"]
+    assert target.get(1)["phase"] == "NEGOTIATION"
+    assert [r["job_id"] for r in source.unfinished()] == ["2"]
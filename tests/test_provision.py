@@ -0,0 +1,77 @@
+import itertools
+
+import pytest
+
+from app import provision, wallets
+from app.config import cfg
+
+
+class FakePrivy:
+    def __init__(self):
+        self.ids = itertools.count(1)
+        self.created = []
+
+    def create_wallet(self):
+        n = next(self.ids)
+        self.created.append(n)
+        return {"id": f"w{n}", "address": f"0x{n:040x}"}
+
+
+@pytest.fixture
+def acp(tmp_path, monkeypatch):
+    monkeypatch.setattr(cfg, "wallet_store", "sqlite")
+    monkeypatch.setattr(cfg, "wallets_db", str(tmp_path / "wallets.db"))
+    monkeypatch.setattr(cfg, "wallets_file", str(tmp_path / "wallets.json"))
+    monkeypatch.setattr(cfg, "setup_rate_per_sec", 1000)
+    monkeypatch.setattr(cfg, "num_agents", 4)
+    privy = FakePrivy()
+    monkeypatch.setattr(provision, "get_client", lambda: privy)
+    state = {"agents": {}, "fail": set(), "privy": privy}
+
+    def run_cli(*args):
+        if args[:2] == ("agent", "list"):
+            return [{"name": n, "walletAddress": a} for n, a in state["agents"].items()], None
+        if args[:2] == ("agent", "create"):
+            name = args[2]
+            state["agents"][name] = f"0xacp-{name}"
+            if name in state["fail"]:
+                return None, "timed out"
+            return {"apiKey": f"key-{name}", "walletAddress": state["agents"][name]}, None
+        if args[:2] == ("agent", "switch"):
+            return {}, None
+        raise AssertionError(args)
+
+    monkeypatch.setattr(provision, "run_cli", run_cli)
+    monkeypatch.setattr(provision, "_read_cli_api_key", lambda: "recovered-key")
+    return state
+
+
+def test_fresh_setup(acp):
+    result = provision.do_setup()
+    assert result["ok"], result
+    assert sorted(w["name"] for w in wallets.get_agents_with_keys()) == sorted(provision.agent_name(i) for i in range(4))
+    assert len(acp["privy"].created) == 4
+
+
+def test_rerun_fills_the_gap_and_reuses_the_wallet(acp):
+    failed = provision.agent_name(1)
+    acp["fail"].add(failed)
+    assert not provision.do_setup()["ok"]
+    assert wallets.get_wallet(failed)["privy_wallet_id"]
+    assert not wallets.get_wallet(failed).get("acp_api_key")
+
+    acp["fail"].clear()
+    result = provision.do_setup()
+    assert result["ok"], result
+    # The agent was created on ACP before the error: its key is recovered, not created again.
+    assert wallets.get_wallet(failed)["acp_api_key"] == "recovered-key"
+    assert provision.progress()["reconciled"] == 1
+    assert len(acp["privy"].created) == 4
+
+
+def test_lowest_missing_names_are_filled_first(acp):
+    wallets.upsert_wallet({"name": provision.agent_name(0), "privy_wallet_id": "w0", "acp_api_key": "k"})
+    wallets.upsert_wallet({"name": provision.agent_name(3), "privy_wallet_id": "w3", "acp_api_key": "k"})
+    assert provision.do_setup()["ok"]
+    names = {w["name"] for w in wallets.load_wallets()}
+    assert names == {provision.agent_name(i) for i in range(4)}